@@ -0,0 +1,106 @@
+"""proyeccion sap
+
+Revision ID: b3c1d9e4f2a7
+Revises: 55ff5ba37e8d
+Create Date: 2026-10-19 12:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3c1d9e4f2a7'
+down_revision: Union[str, Sequence[str], None] = '55ff5ba37e8d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('ope_proyeccion_sap',
+    sa.Column('registro_id', sa.Integer(), nullable=False),
+    sa.Column('fecha_registro', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('estado', sa.String(length=20), nullable=False),
+    sa.Column('chofer_id', sa.Integer(), nullable=False),
+    sa.Column('vehiculo_id', sa.Integer(), nullable=False),
+    sa.Column('transportista_id', sa.Integer(), nullable=False),
+    sa.Column('fecha', sa.String(length=10), nullable=False),
+    sa.Column('o_beta', sa.String(length=50), nullable=False),
+    sa.Column('booking', sa.String(length=50), nullable=False),
+    sa.Column('awb', sa.String(length=50), nullable=False),
+    sa.Column('marca', sa.String(length=50), nullable=False),
+    sa.Column('placas', sa.String(length=50), nullable=False),
+    sa.Column('dni', sa.String(length=20), nullable=False),
+    sa.Column('chofer', sa.String(length=170), nullable=False),
+    sa.Column('licencia', sa.String(length=50), nullable=False),
+    sa.Column('termografos', sa.String(length=200), nullable=False),
+    sa.Column('codigo_sap', sa.String(length=30), nullable=False),
+    sa.Column('transportista', sa.String(length=200), nullable=False),
+    sa.Column('ps_beta', sa.String(length=80), nullable=False),
+    sa.Column('ps_aduana', sa.String(length=80), nullable=False),
+    sa.Column('ps_operador', sa.String(length=80), nullable=False),
+    sa.Column('senasa_ps_linea', sa.String(length=120), nullable=False),
+    sa.Column('n_dam', sa.String(length=80), nullable=False),
+    sa.Column('p_registral', sa.String(length=80), nullable=False),
+    sa.Column('cer_vehicular', sa.String(length=80), nullable=False),
+    sa.Column('actualizado_en', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['registro_id'], ['ope_registros.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('registro_id')
+    )
+    op.create_index('ix_ope_proyeccion_sap_fecha_registro_id', 'ope_proyeccion_sap', ['fecha_registro', 'registro_id'], unique=False)
+    op.create_index(op.f('ix_ope_proyeccion_sap_chofer_id'), 'ope_proyeccion_sap', ['chofer_id'], unique=False)
+    op.create_index(op.f('ix_ope_proyeccion_sap_vehiculo_id'), 'ope_proyeccion_sap', ['vehiculo_id'], unique=False)
+    op.create_index(op.f('ix_ope_proyeccion_sap_transportista_id'), 'ope_proyeccion_sap', ['transportista_id'], unique=False)
+
+    # Backfill: mismas reglas que app/utils/proyeccion_sap.fila_sap
+    # (trim de cada campo, CHOFER = nombre + apellido paterno + inicial del materno)
+    op.execute("""
+        INSERT INTO ope_proyeccion_sap (
+            registro_id, fecha_registro, estado, chofer_id, vehiculo_id, transportista_id,
+            fecha, o_beta, booking, awb, marca, placas, dni, chofer, licencia, termografos,
+            codigo_sap, transportista, ps_beta, ps_aduana, ps_operador, senasa_ps_linea,
+            n_dam, p_registral, cer_vehicular
+        )
+        SELECT
+            r.id, r.fecha_registro, r.estado, r.chofer_id, r.vehiculo_id, r.transportista_id,
+            to_char(r.fecha_registro, 'YYYY-MM-DD'),
+            btrim(coalesce(r.o_beta, '')),
+            btrim(coalesce(r.booking, '')),
+            btrim(coalesce(r.awb, '')),
+            btrim(coalesce(v.marca, '')),
+            btrim(coalesce(v.placas, '')),
+            btrim(coalesce(c.dni, '')),
+            btrim(
+                btrim(coalesce(c.primer_nombre, '')) || ' ' || btrim(coalesce(c.apellido_paterno, ''))
+                || CASE WHEN btrim(coalesce(c.apellido_materno, '')) <> ''
+                        THEN ' ' || upper(left(btrim(c.apellido_materno), 1)) || '.'
+                        ELSE '' END
+            ),
+            btrim(coalesce(c.licencia, '')),
+            btrim(coalesce(r.termografos, '')),
+            btrim(coalesce(t.codigo_sap, '')),
+            btrim(coalesce(t.nombre_transportista, '')),
+            btrim(coalesce(r.ps_beta, '')),
+            btrim(coalesce(r.ps_aduana, '')),
+            btrim(coalesce(r.ps_operador, '')),
+            btrim(coalesce(r.senasa_ps_linea, '')),
+            btrim(coalesce(r.dam, '')),
+            btrim(coalesce(t.partida_registral, '')),
+            btrim(coalesce(v.cert_vehicular, ''))
+        FROM ope_registros r
+        JOIN cat_choferes c ON c.id = r.chofer_id
+        JOIN cat_vehiculos v ON v.id = r.vehiculo_id
+        JOIN cat_transportistas t ON t.id = r.transportista_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_ope_proyeccion_sap_transportista_id'), table_name='ope_proyeccion_sap')
+    op.drop_index(op.f('ix_ope_proyeccion_sap_vehiculo_id'), table_name='ope_proyeccion_sap')
+    op.drop_index(op.f('ix_ope_proyeccion_sap_chofer_id'), table_name='ope_proyeccion_sap')
+    op.drop_index('ix_ope_proyeccion_sap_fecha_registro_id', table_name='ope_proyeccion_sap')
+    op.drop_table('ope_proyeccion_sap')
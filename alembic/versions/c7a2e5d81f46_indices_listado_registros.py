@@ -0,0 +1,46 @@
+"""indices listado registros
+
+Revision ID: c7a2e5d81f46
+Revises: b3c1d9e4f2a7
+Create Date: 2026-10-19 13:05:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7a2e5d81f46'
+down_revision: Union[str, Sequence[str], None] = 'b3c1d9e4f2a7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# nombre -> columnas (todas terminan en fecha_registro, id: orden del keyset)
+INDICES = {
+    "ix_ope_registros_fecha_registro_id": ["fecha_registro", "id"],
+    "ix_ope_registros_estado_fecha_registro_id": ["estado", "fecha_registro", "id"],
+    "ix_ope_registros_booking_fecha_registro_id": ["booking", "fecha_registro", "id"],
+    "ix_ope_registros_transportista_fecha_registro_id": ["transportista_id", "fecha_registro", "id"],
+    "ix_ope_registros_chofer_fecha_registro_id": ["chofer_id", "fecha_registro", "id"],
+}
+
+
+def upgrade() -> None:
+    """
+    Índices compuestos para GET /api/v1/registros.
+    CONCURRENTLY para no bloquear escrituras en ope_registros (necesita ir fuera de la transacción).
+    """
+    with op.get_context().autocommit_block():
+        for nombre, columnas in INDICES.items():
+            op.create_index(
+                nombre, "ope_registros", columnas, unique=False,
+                postgresql_concurrently=True, if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for nombre in INDICES:
+            op.drop_index(nombre, table_name="ope_registros", postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,42 @@
+"""his_unicos indices por prefijo
+
+Revision ID: d4f8a1b6c392
+Revises: c7a2e5d81f46
+Create Date: 2026-10-19 13:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4f8a1b6c392'
+down_revision: Union[str, Sequence[str], None] = 'c7a2e5d81f46'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """
+    Índices varchar_pattern_ops para GET /api/v1/registros/buscar con prefijo
+    (LIKE 'VALOR%'), con y sin tipo. CONCURRENTLY: his_unicos recibe escrituras en cada registro.
+    """
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_his_unicos_valor_patron", "his_unicos", ["valor"],
+            postgresql_ops={"valor": "varchar_pattern_ops"},
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.create_index(
+            "ix_his_unicos_tipo_valor_patron", "his_unicos", ["tipo", "valor"],
+            postgresql_ops={"valor": "varchar_pattern_ops"},
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_his_unicos_tipo_valor_patron", table_name="his_unicos", postgresql_concurrently=True, if_exists=True)
+        op.drop_index("ix_his_unicos_valor_patron", table_name="his_unicos", postgresql_concurrently=True, if_exists=True)
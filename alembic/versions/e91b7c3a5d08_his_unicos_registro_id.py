@@ -0,0 +1,53 @@
+"""his_unicos registro_id
+
+Revision ID: e91b7c3a5d08
+Revises: d4f8a1b6c392
+Create Date: 2026-10-19 14:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e91b7c3a5d08'
+down_revision: Union[str, Sequence[str], None] = 'd4f8a1b6c392'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """
+    his_unicos.registro_id (FK a ope_registros, indexado) en lugar de buscar por
+    referencia = 'REG-<id>' (texto sin índice). Se rellena desde referencia.
+    """
+    op.add_column('his_unicos', sa.Column('registro_id', sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        'fk_his_unicos_registro_id', 'his_unicos', 'ope_registros', ['registro_id'], ['id']
+    )
+
+    # Backfill: solo referencias con el formato de crear_registro y cuyo registro exista
+    op.execute("""
+        UPDATE his_unicos u
+        SET registro_id = r.id
+        FROM ope_registros r
+        WHERE u.referencia ~ '^REG-[0-9]+$'
+          AND r.id = substring(u.referencia FROM 5)::integer
+          AND u.registro_id IS NULL
+    """)
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            op.f('ix_his_unicos_registro_id'), 'his_unicos', ['registro_id'],
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(op.f('ix_his_unicos_registro_id'), table_name='his_unicos', postgresql_concurrently=True, if_exists=True)
+    op.drop_constraint('fk_his_unicos_registro_id', 'his_unicos', type_='foreignkey')
+    op.drop_column('his_unicos', 'registro_id')
@@ -0,0 +1,154 @@
+"""
+Calentamiento al arrancar el proceso (lo corre el lifespan de app/main.py en segundo plano).
+
+Después de un deploy o de un cold start el primer request pagaba: abrir conexiones,
+configurar los mappers de SQLAlchemy y compilar cada consulta. Aquí se paga antes:
+- pool: abre DB_POOL_SIZE conexiones (y las del motor async si DB_ASYNC) y las deja en el pool
+- pool_lectura: lo mismo con la réplica, si DATABASE_URL_LECTURA está configurada
+- mappers: configure_mappers()
+- consultas: corre una vez las consultas calientes con valores que no existen, para
+  que su forma compilada quede en la cache del motor (la cache es por motor)
+- tablas (CALENTAR_TABLAS): lee catálogos y referencias completos para que queden en
+  la cache de la base (shared buffers / disco)
+- ocr (CALENTAR_OCR): importa PIL, pytesseract, OpenCV y numpy (se cargan al primer OCR)
+
+GET /listo responde 503 hasta que termina y muestra cuánto tardó cada paso. Si un
+paso falla (p. ej. la base no responde) /listo sigue en 503 y el siguiente GET /listo
+vuelve a intentar.
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+from dataclasses import dataclass, field
+from time import perf_counter
+
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session, configure_mappers
+
+from app.configuracion import settings
+from app.database import AsyncSessionLocal, SessionLocal, engine, engine_async, engine_lectura
+from app.models.catalogos import Chofer, Transportista, Vehiculo
+from app.models.ref_booking_dam import RefBookingDam
+from app.models.ref_posicionamiento import RefPosicionamiento
+from app.routers.registros import consulta_sap, obtener_refs_por_booking, validar_duplicados
+
+VALOR_INEXISTENTE = "__CALENTAMIENTO__"
+
+
+@dataclass
+class EstadoCalentamiento:
+    estado: str = "pendiente"  # pendiente / calentando / listo / error
+    pasos: dict[str, dict] = field(default_factory=dict)  # nombre -> {"ms": float, "error": str | None}
+    total_ms: float | None = None
+
+    @property
+    def listo(self) -> bool:
+        return self.estado == "listo"
+
+    def como_dict(self) -> dict:
+        return {"listo": self.listo, "estado": self.estado, "total_ms": self.total_ms, "pasos": self.pasos}
+
+
+estado_calentamiento = EstadoCalentamiento()
+_corriendo = threading.Lock()
+
+
+def consultas_calientes(db: Session) -> None:
+    """Las consultas de los endpoints calientes, con la misma forma que usan ellos."""
+    db.query(Chofer).filter(Chofer.dni == VALOR_INEXISTENTE).first()
+    db.query(Vehiculo).filter(Vehiculo.placas == VALOR_INEXISTENTE).first()
+    db.query(Transportista).filter(
+        or_(Transportista.ruc == VALOR_INEXISTENTE, Transportista.codigo_sap == VALOR_INEXISTENTE)
+    ).first()
+    obtener_refs_por_booking(db, VALOR_INEXISTENTE)  # también la de GET /ref/booking
+    validar_duplicados(db, [("AWB", VALOR_INEXISTENTE, True)])
+    db.execute(consulta_sap(ids=[0])).first()
+    db.rollback()
+
+
+def leer_tablas(db: Session) -> None:
+    for modelo in (Chofer, Vehiculo, Transportista, RefPosicionamiento, RefBookingDam):
+        for _ in db.execute(select(modelo.id).execution_options(yield_per=5000)):
+            pass
+    db.rollback()
+
+
+def importar_ocr() -> None:
+    import cv2  # noqa: F401
+    import numpy  # noqa: F401
+    import pytesseract  # noqa: F401
+    from PIL import Image  # noqa: F401
+
+
+def abrir_conexiones(motor=engine) -> None:
+    # Sacarlas todas a la vez obliga al pool a abrir DB_POOL_SIZE conexiones distintas
+    conexiones = [motor.connect() for _ in range(settings.DB_POOL_SIZE)]
+    for c in conexiones:
+        c.close()
+
+
+async def abrir_conexiones_async() -> None:
+    conexiones = [await engine_async.connect() for _ in range(settings.DB_POOL_SIZE)]
+    for c in conexiones:
+        await c.close()
+
+
+async def consultas_calientes_async() -> None:
+    async with AsyncSessionLocal() as db:
+        await db.run_sync(consultas_calientes)
+
+
+def consultas_calientes_sync() -> None:
+    with SessionLocal() as db:
+        consultas_calientes(db)
+
+
+def leer_tablas_sync() -> None:
+    with SessionLocal() as db:
+        leer_tablas(db)
+
+
+def pasos_calentamiento() -> list[tuple[str, object]]:
+    """(nombre, función); las async se esperan, las sync corren en un hilo."""
+    pasos: list[tuple[str, object]] = [
+        ("pool", abrir_conexiones),
+        ("mappers", configure_mappers),
+        ("consultas", consultas_calientes_sync),
+    ]
+    if engine_lectura is not None:
+        pasos.append(("pool_lectura", lambda: abrir_conexiones(engine_lectura)))
+    if settings.DB_ASYNC:
+        pasos += [("pool_async", abrir_conexiones_async), ("consultas_async", consultas_calientes_async)]
+    if settings.CALENTAR_TABLAS:
+        pasos.append(("tablas", leer_tablas_sync))
+    if settings.CALENTAR_OCR:
+        pasos.append(("ocr", importar_ocr))
+    return pasos
+
+
+async def calentar() -> None:
+    """Corre todos los pasos (aunque alguno falle) y deja el resultado en estado_calentamiento."""
+    if not _corriendo.acquire(blocking=False):
+        return  # ya hay un calentamiento en curso
+    try:
+        estado_calentamiento.estado = "calentando"
+        estado_calentamiento.pasos = {}
+        t0 = perf_counter()
+        fallo = False
+        for nombre, funcion in pasos_calentamiento():
+            t_paso = perf_counter()
+            error = None
+            try:
+                if asyncio.iscoroutinefunction(funcion):
+                    await funcion()
+                else:
+                    await asyncio.to_thread(funcion)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                fallo = True
+            estado_calentamiento.pasos[nombre] = {"ms": round((perf_counter() - t_paso) * 1000, 1), "error": error}
+        estado_calentamiento.total_ms = round((perf_counter() - t0) * 1000, 1)
+        estado_calentamiento.estado = "error" if fallo else "listo"
+    finally:
+        _corriendo.release()
@@ -5,6 +5,51 @@ class Settings(BaseSettings):
     DATABASE_URL: str
     SYNC_TOKEN: str  # ✅ token para proteger los endpoints /sync
 
+    # Modo debug: agrega X-Consultas-DB / X-Tiempo-DB-Ms a cada respuesta
+    DEBUG: bool = False
+
+    # Endpoints calientes con sesión async (psycopg v3 / aiosqlite) en vez del threadpool
+    DB_ASYNC: bool = False
+
+    # Pool de conexiones (por proceso: total = workers x (size + overflow), por motor)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30  # segundos esperando conexión libre antes de error
+    DB_POOL_RECYCLE: int = 1800  # reabre conexiones más viejas que esto (Render corta las inactivas)
+    DB_POOL_PRE_PING: bool = True  # valida la conexión al sacarla del pool (evita el 1er request fallido)
+
+    # Réplica de lectura (opcional): lookups, /buscar, listados y exportaciones SAP leen de aquí
+    DATABASE_URL_LECTURA: str | None = None
+    DB_LECTURA_MAX_LAG_S: float = 5  # réplica más atrasada que esto -> se lee del primario
+    DB_LECTURA_LAG_CACHE_S: float = 2  # cada cuánto se vuelve a medir el atraso (por proceso)
+    DB_LECTURA_VENTANA_ESCRITURA_S: float = 15  # tras escribir, el cliente lee del primario este tiempo
+
+    # Consultas lentas (ver app/consultas_lentas.py y GET /api/v1/diagnostico/lentas)
+    CONSULTAS_LENTAS_MS: float = 500  # sentencias más lentas que esto se registran; 0 = apagado
+    CONSULTAS_LENTAS_EXPLAIN_MUESTREO: float = 0  # fracción (0-1) a la que se le captura EXPLAIN ANALYZE (solo Postgres)
+    CONSULTAS_LENTAS_EXPLAIN_TIMEOUT_MS: int = 10_000
+    CONSULTAS_LENTAS_ARCHIVO: str = ""  # planes capturados, una línea JSON cada uno; vacío = solo en memoria
+
+    # Calentamiento al arrancar (ver app/calentamiento.py y GET /listo)
+    CALENTAR_TABLAS: bool = False  # leer catálogos y referencias para dejarlos en la cache de la base
+    CALENTAR_OCR: bool = False  # importar el stack OCR al arrancar en vez de en el primer OCR
+
+    # Compresión de respuestas (brotli si está instalado y el cliente lo acepta, si no gzip)
+    COMPRESION_MIN_BYTES: int = 1000  # respuestas más chicas van sin comprimir
+    COMPRESION_NIVEL_GZIP: int = 6  # 9 (default de Starlette) cuesta mucho más CPU por poco tamaño
+    COMPRESION_CALIDAD_BROTLI: int = 5
+
+    # OCR por lote: archivos procesados a la vez (Tesseract es CPU) y máximo por request
+    OCR_LOTE_CONCURRENCIA: int = 2
+    OCR_LOTE_MAX_ARCHIVOS: int = 20
+
+    # Límites de memoria OCR
+    OCR_MAX_BYTES: int = 15 * 1024 * 1024  # tamaño máximo por archivo subido
+    OCR_MAX_PAGINAS: int = 10  # PDFs más largos se rechazan (solo se lee la 1ra)
+    OCR_PDF_DPI: int = 200  # suficiente para OCR; el default de pdf2image pesa mucho más
+    OCR_MAX_PIXELES: int = 40_000_000  # imágenes más grandes se rechazan antes de decodificar
+    OCR_MAX_CONCURRENTES: int = 2  # OCR simultáneos por proceso (individual + lotes)
+
     class Config:
         env_file = ".env"
         case_sensitive = False
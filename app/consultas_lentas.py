@@ -0,0 +1,242 @@
+"""
+Registro de consultas lentas (lo lee GET /api/v1/diagnostico/lentas).
+
+Con el tiempo de cada sentencia que ya mide app/metricas.py, las que pasan
+CONSULTAS_LENTAS_MS:
+- se loguean (logger "logicapture.consultas_lentas") con la ruta y el endpoint que
+  las ejecutó y sus parámetros redactados (ver parametros_redactados())
+- se acumulan en memoria por (ruta, sentencia normalizada): veces, total, máximo
+- en Postgres, una fracción CONSULTAS_LENTAS_EXPLAIN_MUESTREO se vuelve a correr con
+  EXPLAIN (ANALYZE, BUFFERS) en un hilo aparte (con los parámetros reales, en una
+  transacción que se deshace y con statement_timeout). El plan queda en el acumulado
+  y, si CONSULTAS_LENTAS_ARCHIVO está definido (p. ej. /var/log/logicapture/...), se
+  agrega ahí como una línea JSON. Solo SELECT: EXPLAIN ANALYZE ejecuta la sentencia,
+  así que un INSERT/UPDATE lento se registra sin plan.
+
+El acumulado es por proceso (con varios workers cada uno ve lo suyo); el archivo es
+compartido.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import queue
+import random
+import re
+import threading
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import NullPool
+
+from app.configuracion import settings
+from app.metricas import consultas_actual, ruta_de, segundos_consulta
+
+log = logging.getLogger("logicapture.consultas_lentas")
+
+# Parámetros con alguno de estos nombres, o que contienen alguno de estos fragmentos, van como "***"
+CAMPOS_SENSIBLES = {"chofer"}  # nombre completo en ope_proyeccion_sap (chofer_id no)
+FRAGMENTOS_SENSIBLES = ("dni", "licencia", "nombre", "apellido", "token", "password", "clave")
+_SUFIJO_PARAMETRO = re.compile(r"(_\d+)+$")  # dni_1 -> dni, param_1_2 -> param
+MAX_LARGO_VALOR = 64
+MAX_CONSULTAS = 500  # entradas distintas en memoria; al llenarse sale la de menor tiempo total
+
+# "(?, ?, ?)" / "(%(p_1)s, %(p_2)s)" -> "(...)": un IN de 3 o de 300 valores es la misma consulta
+_LISTA_PARAMETROS = re.compile(r"\(\s*(?:\?|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|:\w+))+\s*\)")
+
+
+@dataclass
+class ConsultaLenta:
+    ruta: str
+    endpoint: str
+    sql: str
+    veces: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    ultima_vez: str = ""
+    ultimos_parametros: dict | None = None
+    ultimo_plan: list | None = field(default=None, repr=False)  # EXPLAIN (FORMAT JSON)
+
+    def como_dict(self, con_plan: bool = False) -> dict:
+        datos = asdict(self)
+        datos["promedio_ms"] = round(self.total_ms / self.veces, 1) if self.veces else 0.0
+        datos["total_ms"] = round(self.total_ms, 1)
+        datos["max_ms"] = round(self.max_ms, 1)
+        if not con_plan:
+            datos.pop("ultimo_plan")
+        return datos
+
+
+_consultas: dict[tuple[str, str], ConsultaLenta] = {}
+_bloqueo = threading.Lock()
+_pendientes_explain: queue.Queue = queue.Queue(maxsize=20)
+_hilo_explain: threading.Thread | None = None
+
+
+def normalizar_sql(statement: str) -> str:
+    return _LISTA_PARAMETROS.sub("(...)", " ".join(statement.split()))
+
+
+def _redactar(nombre: str, valor):
+    base = _SUFIJO_PARAMETRO.sub("", nombre.lower())
+    if base in CAMPOS_SENSIBLES or any(f in base for f in FRAGMENTOS_SENSIBLES):
+        return "***"
+    if isinstance(valor, (bytes, bytearray, memoryview)):
+        return f"<{len(valor)} bytes>"
+    if isinstance(valor, str) and len(valor) > MAX_LARGO_VALOR:
+        return valor[:MAX_LARGO_VALOR] + "…"
+    if valor is None or isinstance(valor, (bool, int, float, str)):
+        return valor
+    return str(valor)
+
+
+def parametros_redactados(parameters, context, executemany: bool) -> dict:
+    """
+    {nombre: valor} con datos personales ocultos y valores largos recortados. Los
+    nombres salen de la sentencia compilada (dni_1, valor_1...) aunque el driver
+    use parámetros posicionales. En executemany solo la 1ra fila, más "_filas".
+    """
+    compilados = getattr(context, "compiled_parameters", None)
+    if compilados:
+        # Ya con los IN expandidos (a_1_1, a_1_2...), a diferencia de compiled.positiontup
+        filas, fila = len(compilados), compilados[0]
+    else:  # SQL de texto (exec_driver_sql)
+        filas = len(parameters) if executemany else 1
+        fila = (parameters[0] if parameters else {}) if executemany else parameters
+        if not isinstance(fila, dict):
+            fila = {str(i): v for i, v in enumerate(fila or ())}
+    redactados = {nombre: _redactar(nombre, valor) for nombre, valor in fila.items()}
+    if filas > 1:
+        redactados["_filas"] = filas
+    return redactados
+
+
+def acumular(ruta: str, endpoint: str, sql: str, ms: float, parametros: dict) -> ConsultaLenta:
+    with _bloqueo:
+        clave = (ruta, sql)
+        entrada = _consultas.get(clave)
+        if entrada is None:
+            if len(_consultas) >= MAX_CONSULTAS:
+                menor = min(_consultas, key=lambda k: _consultas[k].total_ms)
+                del _consultas[menor]
+            entrada = _consultas[clave] = ConsultaLenta(ruta=ruta, endpoint=endpoint, sql=sql)
+        entrada.veces += 1
+        entrada.total_ms += ms
+        entrada.max_ms = max(entrada.max_ms, ms)
+        entrada.ultima_vez = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        entrada.ultimos_parametros = parametros
+        return entrada
+
+
+def top_consultas(orden: str = "total_ms", limite: int = 20, con_plan: bool = False) -> list[dict]:
+    with _bloqueo:
+        entradas = sorted(_consultas.values(), key=lambda c: getattr(c, orden), reverse=True)[:limite]
+        return [c.como_dict(con_plan) for c in entradas]
+
+
+def reiniciar() -> None:
+    with _bloqueo:
+        _consultas.clear()
+
+
+# ---------- EXPLAIN en segundo plano ----------
+
+def explicable(statement: str) -> bool:
+    inicio = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    return inicio in ("SELECT", "WITH") and "FOR UPDATE" not in statement.upper()
+
+
+_motores_explain: dict[str, Engine] = {}
+
+
+def motor_explain(url: str) -> Engine:
+    # Motor propio sin pool: no le quita conexiones a los requests, y con driver sync
+    # aunque la consulta viniera del motor async (psycopg v3 sirve para ambos)
+    if url not in _motores_explain:
+        _motores_explain[url] = create_engine(
+            url, poolclass=NullPool, execution_options={"diagnostico": True}
+        )
+    return _motores_explain[url]
+
+
+def capturar_plan(url: str, statement: str, parameters, entrada: ConsultaLenta, registro: dict) -> None:
+    with motor_explain(url).connect() as conn:
+        with conn.begin() as tx:
+            conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(settings.CONSULTAS_LENTAS_EXPLAIN_TIMEOUT_MS)}")
+            plan = conn.exec_driver_sql(
+                f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement}", parameters
+            ).scalar()
+            tx.rollback()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    with _bloqueo:
+        entrada.ultimo_plan = plan
+    if not settings.CONSULTAS_LENTAS_ARCHIVO:
+        return
+    with Path(settings.CONSULTAS_LENTAS_ARCHIVO).open("a", encoding="utf-8") as f:
+        f.write(json.dumps({**registro, "plan": plan}, ensure_ascii=False, default=str) + "\n")
+
+
+def _trabajar_explains() -> None:
+    while True:
+        tarea = _pendientes_explain.get()
+        try:
+            capturar_plan(*tarea)
+        except Exception as e:
+            log.warning("No se pudo capturar EXPLAIN: %s: %s", type(e).__name__, e)
+        finally:
+            _pendientes_explain.task_done()
+
+
+def encolar_explain(*tarea) -> None:
+    global _hilo_explain
+    if _hilo_explain is None:
+        with _bloqueo:
+            if _hilo_explain is None:
+                _hilo_explain = threading.Thread(target=_trabajar_explains, name="explain-lentas", daemon=True)
+                _hilo_explain.start()
+    try:
+        _pendientes_explain.put_nowait(tarea)
+    except queue.Full:
+        pass  # ya hay bastantes planes en cola: esta muestra se descarta
+
+
+# ---------- eventos ----------
+
+# El inicio lo toma el before_cursor_execute de app/metricas.py (en el contexto de la sentencia)
+@event.listens_for(Engine, "after_cursor_execute")
+def _despues_consulta(conn, cursor, statement, parameters, context, executemany):
+    ms = segundos_consulta(context) * 1000
+    if settings.CONSULTAS_LENTAS_MS <= 0 or ms < settings.CONSULTAS_LENTAS_MS:
+        return
+    if conn.get_execution_options().get("diagnostico"):
+        return  # el propio EXPLAIN
+
+    actual = consultas_actual.get()
+    scope = actual.scope if actual is not None else None
+    ruta = ruta_de(scope) if scope is not None else "sin_request"
+    endpoint = getattr(scope.get("endpoint"), "__name__", "") if scope is not None else ""
+    sql = normalizar_sql(statement)
+    parametros = parametros_redactados(parameters, context, executemany)
+    entrada = acumular(ruta, endpoint, sql, ms, parametros)
+    log.warning(
+        "Consulta lenta %.1f ms en %s (%s): %s | parámetros=%s",
+        ms, ruta, endpoint or "-", sql, json.dumps(parametros, ensure_ascii=False, default=str),
+    )
+
+    if (
+        conn.dialect.name == "postgresql"
+        and not executemany
+        and explicable(statement)
+        and random.random() < settings.CONSULTAS_LENTAS_EXPLAIN_MUESTREO
+    ):
+        registro = {
+            "fecha": entrada.ultima_vez, "ruta": ruta, "endpoint": endpoint, "ms": round(ms, 1),
+            "sql": sql, "parametros": parametros,
+        }
+        copia = dict(parameters) if isinstance(parameters, dict) else tuple(parameters or ())
+        url = conn.engine.url.set(drivername="postgresql+psycopg").render_as_string(hide_password=False)
+        encolar_explain(url, statement, copia, entrada, registro)
@@ -1,10 +1,85 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, DeclarativeBase
+import asyncio
+import functools
+import inspect
+import time
+from contextvars import ContextVar
+
+from fastapi import Depends, Request
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker, DeclarativeBase, Session
 from app.configuracion import settings
+from app.metricas import DB_LECTURAS_TOTAL, PoolMedido, PoolMedidoAsync, instrumentar_pool
+
+
+def opciones_pool(nombre: str) -> dict:
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_logging_name": nombre,
+    }
+
 
-engine = create_engine(settings.DATABASE_URL, future=True)
+engine = create_engine(settings.DATABASE_URL, future=True, poolclass=PoolMedido, **opciones_pool("principal"))
+instrumentar_pool(engine, "principal")
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
 
+
+def url_async(url: str) -> str:
+    """Misma base con driver async: psycopg (v3) para Postgres, aiosqlite para SQLite."""
+    esquema, resto = url.split("://", 1)
+    base = esquema.split("+", 1)[0]
+    if base in ("postgres", "postgresql"):
+        return f"postgresql+psycopg://{resto}"
+    if base == "sqlite":
+        return f"sqlite+aiosqlite://{resto}"
+    return url
+
+
+# Motor async solo si está activado (DB_ASYNC=true): así psycopg v3 no es obligatorio
+engine_async = (
+    create_async_engine(url_async(settings.DATABASE_URL), poolclass=PoolMedidoAsync, **opciones_pool("async"))
+    if settings.DB_ASYNC
+    else None
+)
+if engine_async is not None:
+    instrumentar_pool(engine_async.sync_engine, "async")
+AsyncSessionLocal = (
+    async_sessionmaker(bind=engine_async, autoflush=False, expire_on_commit=False)
+    if engine_async is not None
+    else None
+)
+
+# Réplica de lectura (opcional): solo si DATABASE_URL_LECTURA tiene valor
+engine_lectura = (
+    create_engine(settings.DATABASE_URL_LECTURA, future=True, poolclass=PoolMedido, **opciones_pool("lectura"))
+    if settings.DATABASE_URL_LECTURA
+    else None
+)
+if engine_lectura is not None:
+    instrumentar_pool(engine_lectura, "lectura")
+SessionLectura = (
+    sessionmaker(bind=engine_lectura, autoflush=False, autocommit=False, future=True)
+    if engine_lectura is not None
+    else None
+)
+engine_lectura_async = (
+    create_async_engine(url_async(settings.DATABASE_URL_LECTURA), poolclass=PoolMedidoAsync, **opciones_pool("lectura_async"))
+    if engine_lectura is not None and settings.DB_ASYNC
+    else None
+)
+if engine_lectura_async is not None:
+    instrumentar_pool(engine_lectura_async.sync_engine, "lectura_async")
+AsyncSessionLectura = (
+    async_sessionmaker(bind=engine_lectura_async, autoflush=False, expire_on_commit=False)
+    if engine_lectura_async is not None
+    else None
+)
+
+
 class Base(DeclarativeBase):
     pass
 
@@ -14,3 +89,168 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_db_async():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# ---------- lecturas: réplica si está al día, primario si no ----------
+
+# Read-your-writes sin estado en el servidor:
+# - si el request hizo COMMIT en el primario, MiddlewareLecturaPropia responde X-Escritura: <epoch>
+# - el cliente guarda ese valor (por usuario) y lo reenvía como X-Leer-Primario en las lecturas
+#   que deben ver lo que escribió; dentro de DB_LECTURA_VENTANA_ESCRITURA_S van al primario
+HEADER_ESCRITURA = "x-escritura"
+HEADER_LEER_PRIMARIO = "x-leer-primario"
+
+# Marca del request en curso (mutable: los hilos del threadpool reciben una copia del contexto)
+escritura_actual: ContextVar[dict | None] = ContextVar("escritura_actual", default=None)
+
+
+def _marcar_escritura(conn) -> None:
+    marca = escritura_actual.get()
+    if marca is not None:
+        marca["en"] = time.time()
+
+
+# COMMIT real en el primario (una sesión que solo leyó hace rollback al cerrarse)
+event.listen(engine, "commit", _marcar_escritura)
+if engine_async is not None:
+    event.listen(engine_async.sync_engine, "commit", _marcar_escritura)
+
+# Atraso de la réplica en segundos; 0 si ya reprodujo todo lo recibido (aunque el primario esté ocioso)
+SQL_LAG_REPLICA = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+_lag = {"segundos": None, "medido_en": float("-inf")}
+
+
+def _lag_vigente() -> bool:
+    return time.monotonic() - _lag["medido_en"] < settings.DB_LECTURA_LAG_CACHE_S
+
+
+def lag_replica() -> float | None:
+    """
+    Atraso de la réplica en segundos (None si no responde). Se mide como mucho una vez
+    cada DB_LECTURA_LAG_CACHE_S por proceso, no en cada request.
+    """
+    if not _lag_vigente():
+        try:
+            with engine_lectura.connect() as conn:
+                segundos = float(conn.execute(SQL_LAG_REPLICA).scalar()) if conn.dialect.name == "postgresql" else 0.0
+        except Exception:
+            segundos = None  # réplica caída: se lee del primario hasta la próxima medición
+        _lag.update(segundos=segundos, medido_en=time.monotonic())
+    return _lag["segundos"]
+
+
+def escribio_hace_poco(request: Request) -> bool:
+    """
+    X-Leer-Primario: <epoch de X-Escritura> -> primario si fue hace menos de
+    DB_LECTURA_VENTANA_ESCRITURA_S; cualquier otro valor no vacío -> primario siempre.
+    """
+    valor = request.headers.get(HEADER_LEER_PRIMARIO)
+    if not valor:
+        return False
+    try:
+        escrito_en = float(valor)
+    except ValueError:
+        return True
+    return time.time() - escrito_en < settings.DB_LECTURA_VENTANA_ESCRITURA_S
+
+
+def destino_lectura(request: Request) -> str:
+    """replica / primario_escritura / primario_lag / primario (sin réplica configurada)."""
+    if engine_lectura is None:
+        return "primario"
+    if escribio_hace_poco(request):
+        return "primario_escritura"
+    lag = lag_replica()
+    if lag is None or lag > settings.DB_LECTURA_MAX_LAG_S:
+        return "primario_lag"
+    return "replica"
+
+
+def get_db_lectura(request: Request):
+    """Para endpoints de solo lectura: réplica si está configurada y al día, si no el primario."""
+    destino = destino_lectura(request)
+    DB_LECTURAS_TOTAL.labels(destino=destino).inc()
+    db = SessionLectura() if destino == "replica" else SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_db_lectura_async(request: Request):
+    if engine_lectura is not None and not _lag_vigente() and not escribio_hace_poco(request):
+        await asyncio.to_thread(lag_replica)  # la medición es bloqueante: fuera del event loop
+    destino = destino_lectura(request)
+    DB_LECTURAS_TOTAL.labels(destino=destino).inc()
+    async with (AsyncSessionLectura() if destino == "replica" else AsyncSessionLocal()) as db:
+        yield db
+
+
+class MiddlewareLecturaPropia:
+    """
+    Si el request hizo COMMIT en el primario, agrega X-Escritura: <epoch> a la respuesta.
+    Solo cuenta lo que de verdad escribió en la base (no un POST de OCR ni un 409).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        marca = {"en": None}
+        token = escritura_actual.set(marca)
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start" and marca["en"] is not None:
+                valor = f"{marca['en']:.3f}".encode()
+                mensaje["headers"] = [*mensaje.get("headers", []), (HEADER_ESCRITURA.encode(), valor)]
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            escritura_actual.reset(token)
+
+
+def dependencia_async(default) -> object:
+    # get_db_lectura -> get_db_lectura_async (réplica); cualquier otra -> get_db_async
+    if getattr(default, "dependency", None) is get_db_lectura:
+        return get_db_lectura_async
+    return get_db_async
+
+
+def sesion_adaptable(endpoint):
+    """
+    Para endpoints calientes escritos con Session sync (parámetro `db`).
+    Con DB_ASYNC=true los convierte en `async def` que reciben una AsyncSession y
+    corren el cuerpo con `run_sync`: el I/O a la base va por el driver async (greenlet)
+    en el event loop, sin ocupar un hilo del threadpool de Starlette mientras espera.
+    Con DB_ASYNC=false deja el endpoint tal cual.
+    """
+    if not settings.DB_ASYNC:
+        return endpoint
+
+    firma = inspect.signature(endpoint)
+    params = [
+        p.replace(annotation=AsyncSession, default=Depends(dependencia_async(p.default))) if p.name == "db" else p
+        for p in firma.parameters.values()
+    ]
+
+    @functools.wraps(endpoint)
+    async def envoltura(*args, db: AsyncSession, **kwargs):
+        return await db.run_sync(lambda sesion: endpoint(*args, db=sesion, **kwargs))
+
+    envoltura.__signature__ = firma.replace(parameters=params)
+    return envoltura
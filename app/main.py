@@ -1,12 +1,37 @@
-from fastapi import FastAPI
-from app.routers import choferes, vehiculos, transportistas, registros, ocr, sync, referencias
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from app.calentamiento import calentar, estado_calentamiento
+from app.database import MiddlewareLecturaPropia, engine_lectura
+from app.metricas import MiddlewareMetricas, marcar_proceso_terminado, respuesta_metricas
+from app.routers import choferes, vehiculos, transportistas, registros, ocr, sync, referencias, diagnostico
+from app.utils.respuestas import MiddlewareCompresion
+
+@asynccontextmanager
+async def ciclo_vida(app: FastAPI):
+    # En segundo plano: el proceso ya atiende /salud mientras calienta (/listo dice cuándo termina)
+    app.state.calentamiento = asyncio.create_task(calentar())
+    yield
+    app.state.calentamiento.cancel()
+    marcar_proceso_terminado()
+
 
 app = FastAPI(
     title="BETA LogiCapture 1.0",
     version="0.2.0",
-    description="Catálogos + control de unicidad + preparación SAP."
+    description="Catálogos + control de unicidad + preparación SAP.",
+    lifespan=ciclo_vida,
+    default_response_class=ORJSONResponse,
 )
 
+app.add_middleware(MiddlewareMetricas)
+if engine_lectura is not None:
+    app.add_middleware(MiddlewareLecturaPropia)  # read-your-writes con réplica
+app.add_middleware(MiddlewareCompresion)  # la última agregada es la más externa
+
 app.include_router(choferes.router)
 app.include_router(vehiculos.router)
 app.include_router(transportistas.router)
@@ -14,11 +39,23 @@ app.include_router(registros.router)
 app.include_router(ocr.router)
 app.include_router(sync.router)
 app.include_router(referencias.router)
+app.include_router(diagnostico.router)
 
 @app.get("/salud")
 def salud():
     return {"estado": "ok"}
 
+@app.get("/listo")
+async def listo(request: Request):
+    """Readiness: 503 hasta que termina el calentamiento (si falló, lo reintenta)."""
+    if estado_calentamiento.estado == "error" and request.app.state.calentamiento.done():
+        request.app.state.calentamiento = asyncio.create_task(calentar())
+    return JSONResponse(estado_calentamiento.como_dict(), status_code=200 if estado_calentamiento.listo else 503)
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return respuesta_metricas()
+
 @app.get("/")
 def root():
     return {"status": "ok"}
@@ -0,0 +1,245 @@
+"""
+Métricas Prometheus del backend.
+
+Con varios workers de uvicorn cada proceso tiene sus propios contadores: exportar
+PROMETHEUS_MULTIPROC_DIR (carpeta vacía al arrancar, la misma para todos los workers)
+y /metrics agrega los archivos de todos los procesos. Sin esa variable funciona en
+modo de un solo proceso.
+
+    rm -rf /tmp/prom && mkdir /tmp/prom
+    PROMETHEUS_MULTIPROC_DIR=/tmp/prom uvicorn app.main:app --workers 4
+
+Scrape desde un Prometheus local (prometheus.yml):
+
+    scrape_configs:
+      - job_name: logicapture
+        static_configs:
+          - targets: ["localhost:8000"]
+"""
+import os
+from contextvars import ContextVar
+from dataclasses import dataclass
+from time import perf_counter
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.configuracion import settings
+
+# Etapas OCR: subida, decodificacion, rasterizado, preproceso, tesseract, extraccion
+OCR_ETAPA_SEGUNDOS = Histogram(
+    "ocr_etapa_segundos",
+    "Duración de cada etapa del pipeline OCR",
+    ["etapa", "tipo"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+
+def observar_etapas_ocr(tipo: str, etapas_ms: dict[str, float]) -> None:
+    for etapa, ms in etapas_ms.items():
+        OCR_ETAPA_SEGUNDOS.labels(etapa=etapa, tipo=tipo).observe(ms / 1000)
+
+
+# Pool de conexiones (label motor = pool_logging_name del engine: principal / async / lectura)
+DB_POOL_ESPERA_SEGUNDOS = Histogram(
+    "db_pool_espera_segundos",
+    "Tiempo para obtener una conexión del pool (incluye abrirla si hace falta)",
+    ["motor"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+DB_POOL_EN_USO = Gauge(
+    "db_pool_en_uso", "Conexiones prestadas ahora mismo", ["motor"], multiprocess_mode="livesum"
+)
+DB_POOL_TAMANO = Gauge("db_pool_tamano", "pool_size configurado", ["motor"], multiprocess_mode="livesum")
+DB_POOL_OVERFLOW_TOTAL = Counter(
+    "db_pool_overflow_total", "Conexiones abiertas por encima de pool_size (max_overflow)", ["motor"]
+)
+DB_POOL_TIMEOUTS_TOTAL = Counter(
+    "db_pool_timeouts_total", "Checkouts que agotaron pool_timeout sin conseguir conexión", ["motor"]
+)
+
+
+class _PoolMedido:
+    """Mide la espera de checkout y cuenta overflows (mixin sobre QueuePool)."""
+
+    def _do_get(self):
+        motor = self.logging_name or "principal"
+        overflow_antes = self._overflow
+        t0 = perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            DB_POOL_TIMEOUTS_TOTAL.labels(motor=motor).inc()
+            raise
+        finally:
+            DB_POOL_ESPERA_SEGUNDOS.labels(motor=motor).observe(perf_counter() - t0)
+        if self._overflow > max(overflow_antes, 0):
+            DB_POOL_OVERFLOW_TOTAL.labels(motor=motor).inc()
+        return conn
+
+
+class PoolMedido(_PoolMedido, QueuePool):
+    pass
+
+
+class PoolMedidoAsync(_PoolMedido, AsyncAdaptedQueuePool):
+    pass
+
+
+DB_LECTURAS_TOTAL = Counter(
+    "db_lecturas_total",
+    "Sesiones de lectura por destino (replica / primario_escritura / primario_lag / primario)",
+    ["destino"],
+)
+
+
+def instrumentar_pool(engine, motor: str) -> None:
+    """Gauge de conexiones en uso vía eventos checkout/checkin (sirve para sync y async)."""
+    pool = engine.pool
+    if hasattr(pool, "size"):
+        DB_POOL_TAMANO.labels(motor=motor).set(pool.size())
+    en_uso = DB_POOL_EN_USO.labels(motor=motor)
+    event.listen(pool, "checkout", lambda *_: en_uso.inc())
+    event.listen(pool, "checkin", lambda *_: en_uso.dec())
+
+
+# HTTP (ruta = plantilla de FastAPI, ej. /api/v1/registros/{registro_id}/sap)
+HTTP_LATENCIA_SEGUNDOS = Histogram(
+    "http_latencia_segundos",
+    "Latencia de cada request por ruta",
+    ["metodo", "ruta", "codigo"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+HTTP_EN_CURSO = Gauge(
+    "http_en_curso", "Requests en proceso ahora mismo", ["metodo"], multiprocess_mode="livesum"
+)
+DB_CONSULTAS_POR_REQUEST = Histogram(
+    "db_consultas_por_request",
+    "Sentencias SQL ejecutadas por request",
+    ["ruta"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100, 250),
+)
+DB_SEGUNDOS_POR_REQUEST = Histogram(
+    "db_segundos_por_request",
+    "Tiempo total en la base por request",
+    ["ruta"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+
+# Negocio
+REGISTROS_CREADOS_TOTAL = Counter("registros_creados_total", "Registros operativos creados")
+CONFLICTOS_UNICIDAD_TOTAL = Counter(
+    "conflictos_unicidad_total", "Valores rechazados con 409 por unicidad", ["tipo"]
+)
+SYNC_FILAS_TOTAL = Counter("sync_filas_total", "Filas upsert-eadas por /sync", ["fuente"])
+
+
+@dataclass
+class ConsultasRequest:
+    n: int = 0
+    segundos: float = 0.0
+    scope: dict | None = None  # para saber la ruta/endpoint (ej. app/consultas_lentas.py)
+
+
+# Contador del request actual (mutable: los hilos del threadpool reciben una copia del contexto)
+consultas_actual: ContextVar[ConsultasRequest | None] = ContextVar("consultas_actual", default=None)
+
+
+# El inicio va en el contexto de ejecución (uno por sentencia), no en la conexión:
+# si la sentencia falla (p. ej. IntegrityError -> 409) no queda nada colgado en el pool
+@event.listens_for(Engine, "before_cursor_execute")
+def _antes_consulta(conn, cursor, statement, parameters, context, executemany):
+    context.t_consulta = perf_counter()
+
+
+def segundos_consulta(context) -> float:
+    """Duración de la sentencia de `context` hasta ahora (para otros after_cursor_execute)."""
+    return perf_counter() - context.t_consulta
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _despues_consulta(conn, cursor, statement, parameters, context, executemany):
+    actual = consultas_actual.get()
+    if actual is not None:
+        actual.n += 1
+        actual.segundos += segundos_consulta(context)
+
+
+def ruta_de(scope) -> str:
+    ruta = scope.get("route")
+    # sin ruta (404): una sola serie, para no crear una por cada URL inventada
+    return getattr(ruta, "path", "sin_ruta")
+
+
+def respuesta_metricas():
+    from fastapi import Response
+
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registro = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registro)
+        return Response(generate_latest(registro), media_type=CONTENT_TYPE_LATEST)
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+def marcar_proceso_terminado() -> None:
+    # Los gauges "live*" del proceso dejan de sumarse al apagar el worker
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(os.getpid())
+
+
+class MiddlewareMetricas:
+    """
+    Marca el instante en que llega el request (antes de leer el body) y mide
+    latencia por ruta, requests en curso y consultas/tiempo de DB del request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        t0 = perf_counter()
+        scope.setdefault("state", {})["t_inicio"] = t0
+        metodo = scope["method"]
+        codigo = 500
+        consultas = ConsultasRequest(scope=scope)
+        token = consultas_actual.set(consultas)
+
+        async def enviar(mensaje):
+            nonlocal codigo
+            if mensaje["type"] == "http.response.start":
+                codigo = mensaje["status"]
+                if settings.DEBUG:
+                    # en streaming solo cuenta lo ejecutado antes del primer byte
+                    mensaje["headers"] = [
+                        *mensaje.get("headers", []),
+                        (b"x-consultas-db", str(consultas.n).encode()),
+                        (b"x-tiempo-db-ms", f"{consultas.segundos * 1000:.1f}".encode()),
+                    ]
+            await send(mensaje)
+
+        en_curso = HTTP_EN_CURSO.labels(metodo=metodo)
+        en_curso.inc()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            en_curso.dec()
+            consultas_actual.reset(token)
+            ruta = ruta_de(scope)
+            HTTP_LATENCIA_SEGUNDOS.labels(metodo=metodo, ruta=ruta, codigo=str(codigo)).observe(perf_counter() - t0)
+            DB_CONSULTAS_POR_REQUEST.labels(ruta=ruta).observe(consultas.n)
+            DB_SEGUNDOS_POR_REQUEST.labels(ruta=ruta).observe(consultas.segundos)
@@ -10,6 +10,21 @@ PESO_BRUTO_POR_CONFIG = {
 }
 
 
+def nombre_sap(primer_nombre: str | None, apellido_paterno: str | None, apellido_materno: str | None) -> str:
+    """
+    Formato requerido: PrimerNombre + ApellidoPaterno + InicialApellidoMaterno.
+    Ej: Daniel Quiroz C.
+    """
+    pn = (primer_nombre or "").strip()
+    ap = (apellido_paterno or "").strip()
+    am = (apellido_materno or "").strip()
+
+    inicial = ""
+    if am:
+        inicial = f" {am[0].upper()}."
+    return f"{pn} {ap}{inicial}".strip()
+
+
 class Chofer(Base):
     __tablename__ = "cat_choferes"
 
@@ -30,18 +45,7 @@ class Chofer(Base):
 
     @property
     def nombre_para_sap(self) -> str:
-        """
-        Formato requerido: PrimerNombre + ApellidoPaterno + InicialApellidoMaterno.
-        Ej: Daniel Quiroz C.
-        """
-        pn = (self.primer_nombre or "").strip()
-        ap = (self.apellido_paterno or "").strip()
-        am = (self.apellido_materno or "").strip()
-
-        inicial = ""
-        if am:
-            inicial = f" {am[0].upper()}."
-        return f"{pn} {ap}{inicial}".strip()
+        return nombre_sap(self.primer_nombre, self.apellido_paterno, self.apellido_materno)
 
 
 class Vehiculo(Base):
@@ -1,4 +1,4 @@
-from sqlalchemy import String, Integer, DateTime, func, ForeignKey
+from sqlalchemy import String, Integer, DateTime, func, ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.database import Base
 
@@ -43,3 +43,13 @@ class RegistroOperativo(Base):
     chofer = relationship("Chofer")
     vehiculo = relationship("Vehiculo")
     transportista = relationship("Transportista")
+
+    __table_args__ = (
+        # Listado paginado por keyset (fecha_registro DESC, id DESC): cada filtro
+        # de igualdad va primero para que el rango de fechas sea un index range scan
+        Index("ix_ope_registros_fecha_registro_id", "fecha_registro", "id"),
+        Index("ix_ope_registros_estado_fecha_registro_id", "estado", "fecha_registro", "id"),
+        Index("ix_ope_registros_booking_fecha_registro_id", "booking", "fecha_registro", "id"),
+        Index("ix_ope_registros_transportista_fecha_registro_id", "transportista_id", "fecha_registro", "id"),
+        Index("ix_ope_registros_chofer_fecha_registro_id", "chofer_id", "fecha_registro", "id"),
+    )
@@ -0,0 +1,51 @@
+from sqlalchemy import String, Integer, DateTime, func, ForeignKey, Index
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base
+
+
+class ProyeccionSap(Base):
+    """
+    Fila SAP-ready ya armada (una por registro), para que /sap y las exportaciones
+    lean una sola tabla sin joins. Se mantiene al escribir (ver app/utils/proyeccion_sap.py).
+    Columnas SAP = claves de FilaSapRespuesta en minúscula.
+    """
+    __tablename__ = "ope_proyeccion_sap"
+
+    registro_id: Mapped[int] = mapped_column(ForeignKey("ope_registros.id", ondelete="CASCADE"), primary_key=True)
+
+    # Para filtrar (copiados del registro)
+    fecha_registro: Mapped["DateTime"] = mapped_column(DateTime(timezone=True), nullable=False)
+    estado: Mapped[str] = mapped_column(String(20), nullable=False)
+
+    # De qué catálogos depende la fila (para refrescarla cuando cambian)
+    chofer_id: Mapped[int] = mapped_column(Integer, index=True, nullable=False)
+    vehiculo_id: Mapped[int] = mapped_column(Integer, index=True, nullable=False)
+    transportista_id: Mapped[int] = mapped_column(Integer, index=True, nullable=False)
+
+    # Columnas SAP (mismo orden que FilaSapRespuesta)
+    fecha: Mapped[str] = mapped_column(String(10), nullable=False)
+    o_beta: Mapped[str] = mapped_column(String(50), nullable=False)
+    booking: Mapped[str] = mapped_column(String(50), nullable=False)
+    awb: Mapped[str] = mapped_column(String(50), nullable=False)
+    marca: Mapped[str] = mapped_column(String(50), nullable=False)
+    placas: Mapped[str] = mapped_column(String(50), nullable=False)
+    dni: Mapped[str] = mapped_column(String(20), nullable=False)
+    chofer: Mapped[str] = mapped_column(String(170), nullable=False)
+    licencia: Mapped[str] = mapped_column(String(50), nullable=False)
+    termografos: Mapped[str] = mapped_column(String(200), nullable=False)
+    codigo_sap: Mapped[str] = mapped_column(String(30), nullable=False)
+    transportista: Mapped[str] = mapped_column(String(200), nullable=False)
+    ps_beta: Mapped[str] = mapped_column(String(80), nullable=False)
+    ps_aduana: Mapped[str] = mapped_column(String(80), nullable=False)
+    ps_operador: Mapped[str] = mapped_column(String(80), nullable=False)
+    senasa_ps_linea: Mapped[str] = mapped_column(String(120), nullable=False)
+    n_dam: Mapped[str] = mapped_column(String(80), nullable=False)
+    p_registral: Mapped[str] = mapped_column(String(80), nullable=False)
+    cer_vehicular: Mapped[str] = mapped_column(String(80), nullable=False)
+
+    actualizado_en: Mapped["DateTime"] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    __table_args__ = (
+        # exportación por periodo: rango sobre fecha + orden estable por id
+        Index("ix_ope_proyeccion_sap_fecha_registro_id", "fecha_registro", "registro_id"),
+    )
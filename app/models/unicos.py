@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from datetime import datetime
-from sqlalchemy import String, Integer, DateTime, func, UniqueConstraint, Boolean
+from sqlalchemy import String, Integer, DateTime, func, UniqueConstraint, Boolean, Index, ForeignKey
 from sqlalchemy.orm import Mapped, mapped_column
 from app.database import Base
 
@@ -10,6 +10,9 @@ class Unico(Base):
     __tablename__ = "his_unicos"
     __table_args__ = (
         UniqueConstraint("tipo", "valor", name="uq_unicos_tipo_valor"),
+        # Búsqueda por prefijo (LIKE 'X%'): con collation no-C el btree normal no sirve para LIKE
+        Index("ix_his_unicos_valor_patron", "valor", postgresql_ops={"valor": "varchar_pattern_ops"}),
+        Index("ix_his_unicos_tipo_valor_patron", "tipo", "valor", postgresql_ops={"valor": "varchar_pattern_ops"}),
     )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
@@ -20,6 +23,8 @@ class Unico(Base):
     # Auditoría
     fecha_uso: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     referencia: Mapped[str | None] = mapped_column(String(80), nullable=True)
+    # Registro que tomó el valor (None si vino de otro origen); referencia queda como texto de auditoría
+    registro_id: Mapped[int | None] = mapped_column(ForeignKey("ope_registros.id"), index=True, nullable=True)
     usuario: Mapped[str | None] = mapped_column(String(80), nullable=True)
     origen: Mapped[str | None] = mapped_column(String(20), nullable=True)
 
@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.database import get_db, get_db_lectura, sesion_adaptable
 from app.models.catalogos import Chofer
 from app.schemas.catalogos import ChoferCrear, ChoferRespuesta
+from app.utils.respuestas import DESCRIPCION_CAMPOS, respuesta_lista
 
 router = APIRouter(prefix="/api/v1/choferes", tags=["Choferes"])
 
@@ -25,18 +26,20 @@ def crear_chofer(payload: ChoferCrear, db: Session = Depends(get_db)):
 
 
 @router.get("", response_model=list[ChoferRespuesta])
-def listar_choferes(db: Session = Depends(get_db), limit: int = 50, offset: int = 0):
+def listar_choferes(
+    db: Session = Depends(get_db_lectura),
+    limit: int = 50,
+    offset: int = 0,
+    campos: str | None = Query(None, description=DESCRIPCION_CAMPOS),
+):
     items = db.query(Chofer).order_by(Chofer.id.desc()).offset(offset).limit(limit).all()
-    resp = []
-    for ch in items:
-        d = ChoferRespuesta.model_validate(ch).model_dump()
-        d["nombre_para_sap"] = ch.nombre_para_sap
-        resp.append(d)
-    return resp
+    # nombre_para_sap es property del modelo: from_attributes la lee sin armar dicts a mano
+    return respuesta_lista(items, ChoferRespuesta, campos)
 
 
 @router.get("/buscar", response_model=ChoferRespuesta)
-def buscar_por_dni(dni: str, db: Session = Depends(get_db)):
+@sesion_adaptable
+def buscar_por_dni(dni: str, db: Session = Depends(get_db_lectura)):
     ch = db.query(Chofer).filter(Chofer.dni == dni).first()
     if not ch:
         raise HTTPException(status_code=404, detail="Chofer no encontrado")
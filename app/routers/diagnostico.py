@@ -0,0 +1,33 @@
+from typing import Literal
+
+from fastapi import APIRouter, Header
+
+from app.configuracion import settings
+from app.consultas_lentas import reiniciar, top_consultas
+from app.routers.sync import validar_token
+
+# Muestra SQL y parámetros (redactados): pide el mismo token que /sync
+router = APIRouter(prefix="/api/v1/diagnostico", tags=["Diagnóstico"])
+
+
+@router.get("/lentas")
+def consultas_lentas(
+    orden: Literal["total_ms", "max_ms", "veces"] = "total_ms",
+    limit: int = 20,
+    planes: bool = False,
+    x_sync_token: str | None = Header(default=None),
+):
+    """Sentencias que pasaron CONSULTAS_LENTAS_MS en este proceso, las peores primero."""
+    validar_token(x_sync_token)
+    return {
+        "umbral_ms": settings.CONSULTAS_LENTAS_MS,
+        "muestreo_explain": settings.CONSULTAS_LENTAS_EXPLAIN_MUESTREO,
+        "consultas": top_consultas(orden, limit, con_plan=planes),
+    }
+
+
+@router.delete("/lentas")
+def reiniciar_consultas_lentas(x_sync_token: str | None = Header(default=None)):
+    validar_token(x_sync_token)
+    reiniciar()
+    return {"ok": True}
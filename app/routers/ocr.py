@@ -1,23 +1,231 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Query
-from typing import Literal
+from __future__ import annotations
+
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from typing import TYPE_CHECKING, Literal
+from dataclasses import dataclass, replace
+import asyncio
+import json
+import os
 import re
-from io import BytesIO
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+from app.configuracion import settings
+from app.metricas import observar_etapas_ocr
+from app.utils.tiempos import Cronometro, cronometro_actual, etapa
+from app.utils.ocr_preproceso import PREPROCESO_POR_TIPO, preprocesar
+from app.utils.respuestas import DESCRIPCION_CAMPOS, filtrar_campos
 
-from PIL import Image
-import pytesseract
+# PIL y pytesseract se importan al primer OCR (no al arrancar): así los endpoints
+# que no tocan OCR no pagan su import en un cold start
+if TYPE_CHECKING:
+    from PIL import Image
 
 router = APIRouter(prefix="/api/v1/ocr", tags=["OCR"])
 
 TipoOCR = Literal["DNI", "PS_BETA", "TERMOGRAFO", "BOOKING", "O_BETA", "AWB"]
 
-# Si en tu PC tesseract no está en PATH, descomenta y ajusta:
+# Si en tu PC tesseract no está en PATH, descomenta y ajusta (en ocr_imagen_pil, tras el import):
 # pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
 
+DIGITOS = "0123456789"
+ALFANUM = "ABCDEFGHIJKLMNOPQRSTUVWXYZ" + DIGITOS
+
+
+@dataclass(frozen=True)
+class ConfigTesseract:
+    """
+    - psm: page segmentation mode (6 = bloque de texto, 7 = una línea, 11 = texto disperso)
+    - whitelist: caracteres permitidos (None = todos)
+    - sin_diccionario: desactiva los diccionarios (DAWG); para códigos solo estorban
+    """
+    psm: int = 3
+    whitelist: str | None = None
+    sin_diccionario: bool = False
+    lang: str = "eng"  # eng suele leer mejor códigos
+
+    def como_config(self) -> str:
+        partes = [f"--psm {self.psm}"]
+        if self.whitelist:
+            partes.append(f"-c tessedit_char_whitelist={self.whitelist}")
+        if self.sin_diccionario:
+            partes.append("-c load_system_dawg=0 -c load_freq_dawg=0")
+        return " ".join(partes)
+
+
+TESSERACT_POR_TIPO: dict[str, ConfigTesseract] = {
+    # DNI Perú: 8 dígitos
+    "DNI": ConfigTesseract(psm=6, whitelist=DIGITOS, sin_diccionario=True),
+    # Etiquetas de precinto / termógrafo: pocas palabras sueltas
+    "PS_BETA": ConfigTesseract(psm=11, whitelist=ALFANUM + "-", sin_diccionario=True),
+    "TERMOGRAFO": ConfigTesseract(psm=11, whitelist=ALFANUM, sin_diccionario=True),
+    "BOOKING": ConfigTesseract(psm=6, whitelist=ALFANUM, sin_diccionario=True),
+    "O_BETA": ConfigTesseract(psm=6, whitelist=ALFANUM, sin_diccionario=True),
+    # Contenedor: 4 letras + 6-7 dígitos (+ opcional -dígito)
+    "AWB": ConfigTesseract(psm=6, whitelist=ALFANUM + "-", sin_diccionario=True),
+}
+
+
+def config_tesseract(
+    tipo: TipoOCR | None,
+    psm: int | None = None,
+    whitelist: str | None = None,
+    sin_diccionario: bool | None = None,
+) -> ConfigTesseract:
+    """Config del tipo (o la default) con los overrides que vengan en el request."""
+    cfg = TESSERACT_POR_TIPO.get(tipo, ConfigTesseract()) if tipo else ConfigTesseract()
+    cambios = {}
+    if psm is not None:
+        cambios["psm"] = psm
+    if whitelist is not None:
+        cambios["whitelist"] = whitelist or None  # "" = sin restricción
+    if sin_diccionario is not None:
+        cambios["sin_diccionario"] = sin_diccionario
+    return replace(cfg, **cambios) if cambios else cfg
+
+
+def ocr_imagen_pil(img: Image.Image, tipo: TipoOCR | None = None, cfg_tess: ConfigTesseract | None = None) -> str:
+    import pytesseract
+
+    # Preproceso según el tipo (reescalar, enderezar, recortar, umbral); sin tipo: solo grises
+    cfg = PREPROCESO_POR_TIPO.get(tipo) if tipo else None
+    with etapa("preproceso"):
+        img = preprocesar(img, cfg) if cfg else img.convert("L")
+
+    cfg_tess = cfg_tess or config_tesseract(tipo)
+    with etapa("tesseract"):
+        try:
+            return pytesseract.image_to_string(img, lang=cfg_tess.lang, config=cfg_tess.como_config())
+        except pytesseract.TesseractError as e:
+            # Config que Tesseract rechaza (psm/whitelist): error del request, no del servidor
+            raise HTTPException(status_code=422, detail=f"Tesseract rechazó la config {cfg_tess.como_config()!r}: {e.message}")
+
+
+EXTENSIONES_IMAGEN = (".png", ".jpg", ".jpeg", ".webp", ".bmp")
+EXTENSIONES_OCR = EXTENSIONES_IMAGEN + (".pdf",)
+
+# Tope de OCR simultáneos en el proceso (individual + lotes): acota la RAM
+_cupo_ocr = asyncio.Semaphore(settings.OCR_MAX_CONCURRENTES)
+
+
+async def guardar_upload(archivo: UploadFile) -> Path:
+    """
+    Copia el upload a un temporal en disco por bloques (nunca entero en RAM),
+    cortando con 413 si supera OCR_MAX_BYTES. El llamador debe borrar el archivo.
+    """
+    sufijo = Path(archivo.filename or "").suffix.lower()
+    if sufijo not in EXTENSIONES_OCR:
+        raise HTTPException(status_code=415, detail="Formato no soportado. Usa imagen o PDF.")
+
+    limite = settings.OCR_MAX_BYTES
+    if archivo.size is not None and archivo.size > limite:
+        raise HTTPException(status_code=413, detail=f"Archivo supera el máximo de {limite} bytes")
+
+    tmp = tempfile.NamedTemporaryFile(prefix="ocr_", suffix=sufijo, delete=False)
+    ruta = Path(tmp.name)
+    total = 0
+    try:
+        with tmp:
+            while bloque := await archivo.read(1024 * 1024):
+                total += len(bloque)
+                if total > limite:
+                    raise HTTPException(status_code=413, detail=f"Archivo supera el máximo de {limite} bytes")
+                tmp.write(bloque)
+        if total == 0:
+            raise HTTPException(status_code=400, detail="Archivo vacío")
+    except BaseException:
+        borrar_temporal(ruta)
+        raise
+    return ruta
+
+
+def borrar_temporal(ruta: Path) -> None:
+    try:
+        os.unlink(ruta)
+    except OSError:
+        pass
+
+
+def borrar_temporales(entradas: list[tuple]) -> None:
+    """Temporales de un lote (entradas de extraer_lote: la ruta es el 4to elemento)."""
+    for e in entradas:
+        if e[3] is not None:
+            borrar_temporal(e[3])
+
+
+def _dpi_pdf(info: dict, max_lado: int | None) -> int:
+    """DPI de OCR_PDF_DPI, bajado si la página es tan grande que pasaría max_lado px."""
+    dpi = settings.OCR_PDF_DPI
+    if not max_lado:
+        return dpi
+    # "Page size": "595.276 x 841.89 pts (A4)"
+    m = re.match(r"\s*([\d.]+)\s*x\s*([\d.]+)", str(info.get("Page size", "")))
+    if not m:
+        return dpi
+    lado_pts = max(float(m.group(1)), float(m.group(2)))
+    return max(72, min(dpi, int(max_lado * 72 / lado_pts)))
+
+
+def imagen_desde_archivo(ruta: Path, max_lado: int | None = None) -> Image.Image:
+    """
+    Carga la imagen a OCR-ear: imágenes directo, PDF solo la primera página (MVP).
+    - JPEG se decodifica ya en grises y reducido (draft) si es mucho más grande que max_lado.
+    - PDF se rasteriza en grises a un DPI pensado para OCR, no al default de pdf2image.
+    """
+    sufijo = ruta.suffix.lower()
+
+    # Imagen
+    if sufijo in EXTENSIONES_IMAGEN:
+        from PIL import Image
+
+        try:
+            img = Image.open(ruta)
+        except Exception:
+            raise HTTPException(status_code=400, detail="No se pudo leer la imagen")
+        if img.width * img.height > settings.OCR_MAX_PIXELES:
+            img.close()
+            raise HTTPException(status_code=413, detail="Imagen con demasiados píxeles")
+        if img.format == "JPEG" and max_lado:
+            img.draft("L", (max_lado, max_lado))
+        with etapa("decodificacion"):
+            img.load()
+        return img
+
+    # PDF (MVP: primera página)
+    if sufijo == ".pdf":
+        try:
+            from pdf2image import convert_from_path, pdfinfo_from_path
+            from pdf2image.exceptions import PDFInfoNotInstalledError
+        except Exception:
+            raise HTTPException(status_code=500, detail="Falta instalar pdf2image o dependencias para PDF")
+
+        with etapa("rasterizado"):
+            try:
+                info = pdfinfo_from_path(str(ruta))
+            except PDFInfoNotInstalledError:
+                raise HTTPException(status_code=500, detail="Falta instalar poppler para procesar PDF")
+            except Exception as e:
+                raise HTTPException(status_code=400, detail=f"PDF inválido: {e}")
+            if int(info.get("Pages", 0)) > settings.OCR_MAX_PAGINAS:
+                raise HTTPException(
+                    status_code=413, detail=f"PDF supera el máximo de {settings.OCR_MAX_PAGINAS} páginas"
+                )
 
-def ocr_imagen_pil(img: Image.Image) -> str:
-    # Un poco de preproceso rápido (MVP)
-    img = img.convert("L")  # escala de grises
-    return pytesseract.image_to_string(img, lang="eng")  # eng suele leer mejor códigos; luego afinamos
+            try:
+                paginas = convert_from_path(
+                    str(ruta), dpi=_dpi_pdf(info, max_lado), first_page=1, last_page=1, grayscale=True
+                )
+            except Exception as e:
+                raise HTTPException(status_code=500, detail=f"Error procesando PDF: {e}")
+        if not paginas:
+            raise HTTPException(status_code=400, detail="No se pudo convertir el PDF a imagen")
+        return paginas[0]
+
+    raise HTTPException(status_code=415, detail="Formato no soportado. Usa imagen o PDF.")
 
 
 def extraer_valores(texto: str, tipo: TipoOCR) -> list[str]:
@@ -60,43 +268,24 @@ def extraer_valores(texto: str, tipo: TipoOCR) -> list[str]:
     return []
 
 
-@router.post("/extraer")
-async def extraer(
-    tipo: TipoOCR = Query(...),
-    archivo: UploadFile = File(...)
-):
-    nombre = (archivo.filename or "").lower()
-    data = await archivo.read()
-
-    if not data:
-        raise HTTPException(status_code=400, detail="Archivo vacío")
+def procesar_ocr(
+    ruta: Path,
+    tipo: TipoOCR,
+    cfg_tess: ConfigTesseract,
+) -> dict:
+    """
+    Pipeline completo de un archivo (bloqueante: correr en threadpool).
+    Lanza HTTPException si el archivo no se puede procesar.
+    """
+    cfg_pre = PREPROCESO_POR_TIPO.get(tipo)
+    img = imagen_desde_archivo(ruta, cfg_pre.max_lado if cfg_pre else None)
+    try:
+        texto = ocr_imagen_pil(img, tipo, cfg_tess)
+        with etapa("extraccion"):
+            valores = extraer_valores(texto, tipo)
+    finally:
+        img.close()
 
-    texto = ""
-
-    # Imagen
-    if nombre.endswith((".png", ".jpg", ".jpeg", ".webp", ".bmp")):
-        img = Image.open(BytesIO(data))
-        texto = ocr_imagen_pil(img)
-
-    # PDF (MVP: primera página)
-    elif nombre.endswith(".pdf"):
-        try:
-            from pdf2image import convert_from_bytes
-        except Exception:
-            raise HTTPException(status_code=500, detail="Falta instalar pdf2image o dependencias para PDF")
-
-        try:
-            paginas = convert_from_bytes(data, first_page=1, last_page=1)
-            if not paginas:
-                raise HTTPException(status_code=400, detail="No se pudo convertir el PDF a imagen")
-            texto = ocr_imagen_pil(paginas[0])
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Error procesando PDF: {e}")
-
-    else:
-        raise HTTPException(status_code=415, detail="Formato no soportado. Usa imagen o PDF.")
-
-    valores = extraer_valores(texto, tipo)
     # deduplicar manteniendo orden
     vistos = set()
     valores_unicos = []
@@ -107,7 +296,151 @@ async def extraer(
 
     return {
         "tipo": tipo,
+        "config_tesseract": cfg_tess.como_config(),
         "texto": texto,
         "valores_detectados": valores_unicos,
         "mejor_valor": valores_unicos[0] if valores_unicos else None
     }
+
+
+@router.get("/config")
+def config_cliente():
+    """
+    Lo que el cliente debe hacer antes de subir (para no mandar MB que el backend descarta):
+    reducir al lado máximo que usa el preproceso del tipo, pasar a grises y re-codificar.
+    """
+    por_tipo = {t: cfg.max_lado for t, cfg in PREPROCESO_POR_TIPO.items() if cfg.max_lado}
+    return {
+        "max_lado_px": max(por_tipo.values(), default=None),
+        "max_lado_por_tipo": por_tipo,
+        "escala_grises": True,
+        "formato_captura": "PNG",  # capturas de pantalla: PNG en grises comprime mejor y sin artefactos
+        "formato_foto": "JPEG",
+        "calidad_jpeg": 85,
+        "max_bytes": settings.OCR_MAX_BYTES,
+        "extensiones": list(EXTENSIONES_OCR),
+    }
+
+
+@router.post("/extraer")
+async def extraer(
+    request: Request,
+    response: Response,
+    tipo: TipoOCR = Query(...),
+    archivo: UploadFile = File(...),
+    # Overrides opcionales de la config Tesseract del tipo
+    # 0 solo detecta orientación, 1 necesita osd.traineddata y 2 no está implementado: ninguno devuelve texto
+    psm: int | None = Query(None, ge=3, le=13, description="Page segmentation mode de Tesseract (3-13)"),
+    whitelist: str | None = Query(None, max_length=100, pattern=r"^[A-Za-z0-9./-]*$"),
+    sin_diccionario: bool | None = Query(None),
+    campos: str | None = Query(None, description=DESCRIPCION_CAMPOS + " Ej: mejor_valor,valores_detectados (sin texto crudo)."),
+):
+    crono = Cronometro()
+    cronometro_actual.set(crono)
+
+    # subida = recepción + parseo multipart (antes del handler) + copia a disco
+    t_inicio = request.scope.get("state", {}).get("t_inicio")
+    if t_inicio is not None:
+        crono.sumar("subida", (perf_counter() - t_inicio) * 1000)
+    with crono.etapa("subida"):
+        ruta = await guardar_upload(archivo)
+
+    cfg_tess = config_tesseract(tipo, psm, whitelist, sin_diccionario)
+    try:
+        # OCR es CPU: fuera del event loop y con cupo global ("cola" = espera por el cupo)
+        t_cola = perf_counter()
+        async with _cupo_ocr:
+            crono.sumar("cola", (perf_counter() - t_cola) * 1000)
+            res = await run_in_threadpool(procesar_ocr, ruta, tipo, cfg_tess)
+    finally:
+        borrar_temporal(ruta)
+        observar_etapas_ocr(tipo, crono.etapas)
+
+    response.headers["Server-Timing"] = crono.server_timing()
+    return filtrar_campos(res, campos)
+
+
+@router.post("/extraer/lote")
+async def extraer_lote(
+    archivos: list[UploadFile] = File(...),
+    tipo: TipoOCR | None = Query(None, description="Tipo para todos los archivos"),
+    tipos: list[TipoOCR] | None = Form(None, description="Un tipo por archivo (mismo orden que archivos)"),
+    formato: Literal["ndjson", "sse"] = Query("ndjson"),
+):
+    """
+    OCR de varios archivos en paralelo (acotado por OCR_LOTE_CONCURRENCIA).
+    Cada resultado se emite apenas termina (NDJSON o SSE), no en el orden de subida;
+    usar "indice" para ubicarlo.
+    """
+    if len(archivos) > settings.OCR_LOTE_MAX_ARCHIVOS:
+        raise HTTPException(status_code=413, detail=f"Máximo {settings.OCR_LOTE_MAX_ARCHIVOS} archivos por lote")
+    if tipos is not None and len(tipos) != len(archivos):
+        raise HTTPException(status_code=422, detail="tipos debe tener un elemento por archivo")
+    if tipos is None and tipo is None:
+        raise HTTPException(status_code=422, detail="Debes enviar tipo o tipos")
+
+    # Pasamos todo a disco antes de responder: los UploadFile se cierran al terminar el handler.
+    # Un archivo rechazado (tamaño/formato) se reporta como error de ese archivo, no del lote.
+    entradas = []
+    try:
+        for i, archivo in enumerate(archivos):
+            t = tipos[i] if tipos is not None else tipo
+            try:
+                entradas.append((i, archivo.filename or "", t, await guardar_upload(archivo), None))
+            except HTTPException as e:
+                entradas.append((i, archivo.filename or "", t, None, e))
+    except BaseException:
+        # Error inesperado (disco lleno, cliente que corta la subida): no dejar los ya copiados
+        borrar_temporales(entradas)
+        raise
+
+    semaforo = asyncio.Semaphore(settings.OCR_LOTE_CONCURRENCIA)
+
+    async def procesar_uno(indice: int, nombre: str, t: TipoOCR, ruta: Path | None, error: HTTPException | None) -> dict:
+        base = {"indice": indice, "archivo": nombre, "tipo": t}
+        if error is not None:
+            return {**base, "ok": False, "status": error.status_code, "error": error.detail}
+
+        # Cada tarea tiene su propio contexto: cronómetro por archivo
+        crono = Cronometro()
+        cronometro_actual.set(crono)
+        t_cola = perf_counter()
+        async with semaforo, _cupo_ocr:
+            crono.sumar("cola", (perf_counter() - t_cola) * 1000)
+            try:
+                res = await run_in_threadpool(procesar_ocr, ruta, t, config_tesseract(t))
+                return {**base, "ok": True, **res, "tiempos_ms": crono.etapas}
+            except HTTPException as e:
+                return {**base, "ok": False, "status": e.status_code, "error": e.detail}
+            except Exception as e:
+                return {**base, "ok": False, "status": 500, "error": f"Error procesando archivo: {e}"}
+            finally:
+                borrar_temporal(ruta)
+                observar_etapas_ocr(t, crono.etapas)
+
+    def serializar(evento: str, datos: dict) -> str:
+        linea = json.dumps(datos, ensure_ascii=False)
+        return f"event: {evento}\ndata: {linea}\n\n" if formato == "sse" else linea + "\n"
+
+    async def emitir():
+        tareas = [asyncio.create_task(procesar_uno(*e)) for e in entradas]
+        try:
+            for siguiente in asyncio.as_completed(tareas):
+                yield serializar("resultado", await siguiente)
+            if formato == "sse":
+                yield serializar("fin", {"total": len(tareas)})
+        finally:
+            # Cliente desconectado: no arrancar los que siguen en cola
+            for t in tareas:
+                t.cancel()
+            borrar_temporales(entradas)
+
+    media_type = "text/event-stream" if formato == "sse" else "application/x-ndjson"
+    # La tarea de fondo borra los temporales aunque emitir() nunca llegue a iterarse
+    # (cliente que se desconecta antes de que empiece el stream)
+    return StreamingResponse(
+        emitir(),
+        media_type=media_type,
+        headers={"Cache-Control": "no-cache"},
+        background=BackgroundTask(borrar_temporales, entradas),
+    )
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.database import get_db_lectura, sesion_adaptable
 from app.models.ref_posicionamiento import RefPosicionamiento
 from app.models.ref_booking_dam import RefBookingDam
 
@@ -10,7 +10,8 @@ def normalizar(v: str) -> str:
     return " ".join(v.strip().split()).upper()
 
 @router.get("/booking/{booking}")
-def ref_por_booking(booking: str, db: Session = Depends(get_db)):
+@sesion_adaptable
+def ref_por_booking(booking: str, db: Session = Depends(get_db_lectura)):
     b = normalizar(booking)
 
     pos = db.query(RefPosicionamiento).filter(RefPosicionamiento.booking == b).first()
@@ -1,21 +1,44 @@
-from datetime import datetime, timezone
-
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import or_
+import base64
+import binascii
+import csv
+import io
+import json
+import os
+import tempfile
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy import insert, or_, select, tuple_, update
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm import Session
+from starlette.background import BackgroundTask
 
-from app.database import get_db
+from app.database import get_db, get_db_lectura, sesion_adaptable
+from app.metricas import CONFLICTOS_UNICIDAD_TOTAL, REGISTROS_CREADOS_TOTAL
 from app.models.catalogos import Chofer, Vehiculo, Transportista
 from app.models.operacion import RegistroOperativo
 from app.models.unicos import Unico
+from app.models.proyeccion_sap import ProyeccionSap
 
 # ✅ NUEVO: referencias por booking
 from app.models.ref_posicionamiento import RefPosicionamiento
 from app.models.ref_booking_dam import RefBookingDam
 
-from app.schemas.operacion import RegistroCrear, RegistroRespuesta, FilaSapRespuesta
+from app.schemas.operacion import (
+    RegistroCrear,
+    RegistroRespuesta,
+    RegistroResumen,
+    RegistroPagina,
+    UnicoEncontrado,
+    CierreLote,
+    CierreLoteRespuesta,
+    ResultadoCierre,
+    FilaSapRespuesta,
+)
 from app.utils.unicidad import normalizar, dividir_por_slash, unir_por_slash
+from app.utils.proyeccion_sap import COLUMNAS_SAP
 
 router = APIRouter(prefix="/api/v1/registros", tags=["Registros"])
 
@@ -46,10 +69,6 @@ def construir_senasa_ps_linea(senasa: str | None, ps_linea: str | None) -> str |
     return None
 
 
-def safe_str(x) -> str:
-    return (x or "").strip()
-
-
 def obtener_refs_por_booking(db: Session, booking: str | None) -> dict:
     """
     Busca en tablas de referencia:
@@ -115,16 +134,25 @@ def validar_duplicados(db: Session, items: list[tuple[str, str, bool]]) -> list[
     """
     - Históricos: choca si existe cualquier registro con mismo tipo/valor.
     - Vigentes (AWB): choca solo si existe vigente=True.
+    Una sola consulta para todos los items (antes era una por item).
     """
-    duplicados: list[dict] = []
+    if not items:
+        return []
+
+    usados: set[tuple[str, str]] = set()
+    en_uso: set[tuple[str, str]] = set()
+    filas = db.execute(
+        select(Unico.tipo, Unico.valor, Unico.vigente)
+        .where(tuple_(Unico.tipo, Unico.valor).in_({(tipo, valor) for tipo, valor, _ in items}))
+    )
+    for tipo, valor, vigente_db in filas:
+        usados.add((tipo, valor))
+        if vigente_db:
+            en_uso.add((tipo, valor))
 
+    duplicados: list[dict] = []
     for tipo, valor, vigente in items:
-        q = db.query(Unico).filter(Unico.tipo == tipo, Unico.valor == valor)
-        if vigente:
-            q = q.filter(Unico.vigente == True)  # noqa: E712
-        existe = q.first()
-
-        if existe:
+        if (tipo, valor) in (en_uso if vigente else usados):
             duplicados.append(
                 {
                     "tipo": tipo,
@@ -138,7 +166,13 @@ def validar_duplicados(db: Session, items: list[tuple[str, str, bool]]) -> list[
     return duplicados
 
 
+def contar_conflictos(duplicados: list[dict]) -> None:
+    for d in duplicados:
+        CONFLICTOS_UNICIDAD_TOTAL.labels(tipo=d["tipo"]).inc()
+
+
 @router.post("", response_model=RegistroRespuesta)
+@sesion_adaptable
 def crear_registro(payload: RegistroCrear, db: Session = Depends(get_db)):
     # 1) Resolver chofer por DNI
     chofer = db.query(Chofer).filter(Chofer.dni == payload.dni).first()
@@ -214,6 +248,7 @@ def crear_registro(payload: RegistroCrear, db: Session = Depends(get_db)):
     items_unicos = construir_items_unicos(payload, senasa_ps_linea_norm)
     duplicados = validar_duplicados(db, items_unicos)
     if duplicados:
+        contar_conflictos(duplicados)
         raise HTTPException(status_code=409, detail={"duplicados": duplicados})
 
     # 8) Guardar registro + candados en una sola transacción
@@ -241,30 +276,147 @@ def crear_registro(payload: RegistroCrear, db: Session = Depends(get_db)):
 
         referencia = f"REG-{reg.id}"
 
-        for tipo, valor, vigente in items_unicos:
-            db.add(
-                Unico(
-                    tipo=tipo,
-                    valor=valor,
-                    referencia=referencia,
-                    usuario="sistema",  # luego lo conectamos a usuarios reales
-                    origen="registro",
-                    vigente=vigente,
-                )
+        # Todos los candados en un solo INSERT (executemany), no uno por valor
+        if items_unicos:
+            db.execute(
+                insert(Unico),
+                [
+                    {
+                        "tipo": tipo,
+                        "valor": valor,
+                        "referencia": referencia,
+                        "registro_id": reg.id,
+                        "usuario": "sistema",  # luego lo conectamos a usuarios reales
+                        "origen": "registro",
+                        "vigente": vigente,
+                    }
+                    for tipo, valor, vigente in items_unicos
+                ],
             )
 
         db.commit()
         db.refresh(reg)
+        REGISTROS_CREADOS_TOTAL.inc()
         return reg
 
     except IntegrityError:
         db.rollback()
         duplicados = validar_duplicados(db, items_unicos)
         if duplicados:
+            contar_conflictos(duplicados)
             raise HTTPException(status_code=409, detail={"duplicados": duplicados})
+        CONFLICTOS_UNICIDAD_TOTAL.labels(tipo="desconocido").inc()
         raise HTTPException(status_code=409, detail="Conflicto de unicidad.")
 
 
+def codificar_cursor(fecha: datetime, registro_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{fecha.isoformat()}|{registro_id}".encode()).decode()
+
+
+def decodificar_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        fecha, registro_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(fecha), int(registro_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=422, detail="Cursor inválido")
+
+
+@router.get("", response_model=RegistroPagina)
+def listar_registros(
+    desde: date | None = Query(None, description="Fecha de registro desde (inclusive)"),
+    hasta: date | None = Query(None, description="Fecha de registro hasta (inclusive)"),
+    estado: str | None = Query(None, description="borrador / cerrado"),
+    booking: str | None = None,
+    transportista: str | None = Query(None, description="RUC o código SAP"),
+    dni: str | None = Query(None, description="DNI del chofer"),
+    cursor: str | None = Query(None, description="Valor 'siguiente' de la página anterior"),
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_db_lectura),
+):
+    """
+    Registros más recientes primero, con paginación keyset sobre (fecha_registro, id):
+    cada página es un range scan del índice compuesto que corresponda al filtro,
+    sin OFFSET (la página 1000 cuesta lo mismo que la primera).
+    """
+    stmt = select(RegistroOperativo)
+
+    if desde:
+        stmt = stmt.where(RegistroOperativo.fecha_registro >= datetime.combine(desde, time.min))
+    if hasta:
+        stmt = stmt.where(RegistroOperativo.fecha_registro < datetime.combine(hasta + timedelta(days=1), time.min))
+    if estado:
+        stmt = stmt.where(RegistroOperativo.estado == estado)
+    if booking:
+        stmt = stmt.where(RegistroOperativo.booking == normalizar(booking))
+    # Catálogos como subconsulta escalar: el filtro queda sobre la FK indexada
+    if transportista:
+        t = transportista.strip()
+        sub = select(Transportista.id).where(or_(Transportista.ruc == t, Transportista.codigo_sap == t)).limit(1)
+        stmt = stmt.where(RegistroOperativo.transportista_id == sub.scalar_subquery())
+    if dni:
+        sub = select(Chofer.id).where(Chofer.dni == dni.strip())
+        stmt = stmt.where(RegistroOperativo.chofer_id == sub.scalar_subquery())
+
+    if cursor:
+        fecha, ultimo_id = decodificar_cursor(cursor)
+        stmt = stmt.where(tuple_(RegistroOperativo.fecha_registro, RegistroOperativo.id) < (fecha, ultimo_id))
+
+    # Pedimos una fila de más para saber si hay página siguiente
+    stmt = stmt.order_by(RegistroOperativo.fecha_registro.desc(), RegistroOperativo.id.desc()).limit(limit + 1)
+    regs = db.scalars(stmt).all()
+
+    siguiente = None
+    if len(regs) > limit:
+        regs = regs[:limit]
+        siguiente = codificar_cursor(regs[-1].fecha_registro, regs[-1].id)
+
+    return RegistroPagina(items=[RegistroResumen.model_validate(r) for r in regs], siguiente=siguiente)
+
+
+def escapar_like(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+@router.get("/buscar", response_model=list[UnicoEncontrado])
+def buscar_por_unico(
+    valor: str = Query(..., min_length=1, description="Precinto, termógrafo, AWB, booking... (o su inicio)"),
+    tipo: str | None = Query(None, description="Restringe a un tipo de his_unicos (ej. PS_BETA)"),
+    prefijo: bool = Query(False, description="True = valores que empiezan con `valor`"),
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_db_lectura),
+):
+    """
+    Resuelve un valor único (o prefijo) a los registros que lo usaron, vía his_unicos
+    (índice por valor / tipo+valor) en vez de LIKE sobre los campos con "/" de ope_registros.
+    Una sola consulta: his_unicos JOIN ope_registros.
+    """
+    v = normalizar(valor)
+    if not v:
+        raise HTTPException(status_code=422, detail="valor vacío")
+
+    stmt = select(Unico, RegistroOperativo).join(RegistroOperativo, RegistroOperativo.id == Unico.registro_id)
+
+    if prefijo:
+        stmt = stmt.where(Unico.valor.like(escapar_like(v) + "%", escape="\\"))
+    else:
+        stmt = stmt.where(Unico.valor == v)
+    if tipo:
+        stmt = stmt.where(Unico.tipo == normalizar(tipo))
+
+    stmt = stmt.order_by(Unico.fecha_uso.desc(), Unico.id.desc()).limit(limit)
+
+    return [
+        UnicoEncontrado(
+            tipo=u.tipo,
+            valor=u.valor,
+            vigente=u.vigente,
+            fecha_uso=u.fecha_uso,
+            registro=RegistroResumen.model_validate(reg),
+        )
+        for u, reg in db.execute(stmt).tuples()
+    ]
+
+
 @router.post("/{registro_id}/cerrar")
 def cerrar_registro(registro_id: int, db: Session = Depends(get_db)):
     reg = db.query(RegistroOperativo).filter(RegistroOperativo.id == registro_id).first()
@@ -276,12 +428,11 @@ def cerrar_registro(registro_id: int, db: Session = Depends(get_db)):
 
     reg.estado = "cerrado"
 
-    referencia = f"REG-{reg.id}"
     ahora = datetime.now(timezone.utc)
 
     # Liberar solo los tipos vigentes (AWB)
     db.query(Unico).filter(
-        Unico.referencia == referencia,
+        Unico.registro_id == reg.id,
         Unico.tipo.in_(list(TIPOS_VIGENTES)),
         Unico.vigente == True  # noqa: E712
     ).update(
@@ -293,46 +444,298 @@ def cerrar_registro(registro_id: int, db: Session = Depends(get_db)):
     return {"estado": "cerrado", "awbs_liberados": True}
 
 
-@router.get("/{registro_id}/sap", response_model=FilaSapRespuesta)
-def obtener_fila_sap(registro_id: int, db: Session = Depends(get_db)):
-    reg = (
-        db.query(RegistroOperativo)
-        .options(
-            joinedload(RegistroOperativo.chofer),
-            joinedload(RegistroOperativo.vehiculo),
-            joinedload(RegistroOperativo.transportista),
+@router.post("/cerrar-lote", response_model=CierreLoteRespuesta)
+def cerrar_lote(payload: CierreLote, db: Session = Depends(get_db)):
+    """
+    Cierra varios borradores y libera sus candados vigentes (AWB) en una sola transacción:
+    un UPDATE ... RETURNING sobre ope_registros y otro sobre his_unicos por registro_id,
+    en vez de un request + commit por registro.
+
+    Con 'hasta' no hay tope de registros: los UPDATE siguientes toman los cerrados con una
+    subconsulta (mismos filtros + el actualizado_en de este cierre) en vez de mandar los ids
+    como parámetros (Postgres acepta hasta 65535 por sentencia).
+    """
+    if not payload.ids and not payload.hasta:
+        raise HTTPException(status_code=422, detail="Debes enviar ids o una fecha 'hasta'")
+
+    filtros = []
+    if payload.ids:
+        filtros.append(RegistroOperativo.id.in_(payload.ids))
+    if payload.hasta:
+        filtros.append(
+            RegistroOperativo.fecha_registro < datetime.combine(payload.hasta + timedelta(days=1), time.min)
         )
-        .filter(RegistroOperativo.id == registro_id)
-        .first()
+
+    ahora = datetime.now(timezone.utc)
+
+    # 1) Cerrar (solo los que siguen en borrador: dos cierres concurrentes no se pisan)
+    cerrados = db.execute(
+        update(RegistroOperativo)
+        .where(RegistroOperativo.estado == "borrador", *filtros)
+        .values(estado="cerrado", actualizado_en=ahora)
+        .returning(RegistroOperativo.id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+
+    liberados: dict[int, int] = {}
+    if cerrados:
+        # Los que cerró el UPDATE de arriba (quedan bloqueados hasta el commit)
+        cerrados_ahora = select(RegistroOperativo.id).where(
+            RegistroOperativo.estado == "cerrado", RegistroOperativo.actualizado_en == ahora, *filtros
+        )
+
+        # 2) Liberar los tipos vigentes de todos los cerrados de una vez
+        filas = db.execute(
+            update(Unico)
+            .where(
+                Unico.registro_id.in_(cerrados_ahora),
+                Unico.tipo.in_(list(TIPOS_VIGENTES)),
+                Unico.vigente == True,  # noqa: E712
+            )
+            .values(vigente=False, liberado_en=ahora)
+            .returning(Unico.registro_id)
+            .execution_options(synchronize_session=False)
+        ).scalars().all()
+        for rid in filas:
+            liberados[rid] = liberados.get(rid, 0) + 1
+
+        # Los UPDATE masivos no pasan por el flush: la proyección SAP se actualiza aquí
+        db.execute(
+            update(ProyeccionSap)
+            .where(ProyeccionSap.registro_id.in_(cerrados_ahora))
+            .values(estado="cerrado", actualizado_en=ahora)
+            .execution_options(synchronize_session=False)
+        )
+
+    db.commit()
+
+    resultados = [ResultadoCierre(id=rid, estado="cerrado", awbs_liberados=liberados.get(rid, 0)) for rid in cerrados]
+
+    # Ids pedidos que no se cerraron ahora: ¿ya estaban cerrados o no existen?
+    faltantes = set(payload.ids or []) - set(cerrados)
+    if faltantes:
+        existentes = set(db.scalars(select(RegistroOperativo.id).where(RegistroOperativo.id.in_(faltantes))))
+        resultados += [
+            ResultadoCierre(id=rid, estado="ya estaba cerrado" if rid in existentes else "no encontrado")
+            for rid in sorted(faltantes)
+        ]
+
+    return CierreLoteRespuesta(cerrados=len(cerrados), resultados=resultados)
+
+
+COLUMNAS_EXPORT_SAP = ["REGISTRO_ID", *COLUMNAS_SAP]
+
+
+def consulta_sap(
+    ids: list[int] | None = None,
+    desde: date | None = None,
+    hasta: date | None = None,
+    estado: str | None = None,
+):
+    """
+    Filas SAP ya armadas desde la proyección (una tabla, sin joins), filtradas por ids
+    y/o rango de fechas (hasta inclusive) y estado. Columnas = COLUMNAS_EXPORT_SAP.
+    """
+    stmt = select(ProyeccionSap.registro_id, *(ProyeccionSap.__table__.c[c.lower()] for c in COLUMNAS_SAP))
+    if ids:
+        stmt = stmt.where(ProyeccionSap.registro_id.in_(ids))
+    if desde:
+        stmt = stmt.where(ProyeccionSap.fecha_registro >= datetime.combine(desde, time.min))
+    if hasta:
+        stmt = stmt.where(ProyeccionSap.fecha_registro < datetime.combine(hasta + timedelta(days=1), time.min))
+    if estado:
+        stmt = stmt.where(ProyeccionSap.estado == estado)
+    return stmt.order_by(ProyeccionSap.fecha_registro, ProyeccionSap.registro_id)
+
+
+def filas_export_sap(db: Session, stmt, lote: int = 500):
+    """
+    Recorre el resultado con cursor del lado del servidor (stream_results + yield_per):
+    en Postgres es un cursor con nombre y se traen `lote` filas por viaje, así la
+    memoria no crece con el rango y la primera fila sale sin esperar a la última.
+    """
+    resultado = db.execute(stmt.execution_options(stream_results=True, yield_per=lote))
+    for r in resultado:
+        yield list(r)
+
+
+def csv_en_bloques(filas, lote: int = 500):
+    """Serializa a CSV por bloques de `lote` filas (BOM para que Excel lea tildes)."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    buf.write("\ufeff")
+    writer.writerow(COLUMNAS_EXPORT_SAP)
+    for i, fila in enumerate(filas, start=1):
+        writer.writerow(fila)
+        if i % lote == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+
+def ndjson_en_bloques(filas, lote: int = 500):
+    """Un objeto JSON por línea (claves = COLUMNAS_EXPORT_SAP), por bloques de `lote` filas."""
+    bloque = []
+    for fila in filas:
+        bloque.append(json.dumps(dict(zip(COLUMNAS_EXPORT_SAP, fila)), ensure_ascii=False))
+        if len(bloque) == lote:
+            yield "\n".join(bloque) + "\n"
+            bloque = []
+    if bloque:
+        yield "\n".join(bloque) + "\n"
+
+
+class _SumideroBytes(io.RawIOBase):
+    """Archivo de solo escritura que acumula lo escrito hasta que se vacía (para streaming)."""
+
+    def __init__(self):
+        self._partes: list[bytes] = []
+        self._pos = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._partes.append(bytes(b))
+        self._pos += len(b)
+        return len(b)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def vaciar(self) -> bytes:
+        datos = b"".join(self._partes)
+        self._partes.clear()
+        return datos
+
+
+def parquet_en_bloques(filas, lote: int = 5000):
+    """
+    Parquet por row groups de `lote` filas: cada grupo se escribe y se envía apenas
+    se completa (el footer con los metadatos va al final, como exige el formato).
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    esquema = pa.schema(
+        [pa.field("REGISTRO_ID", pa.int64())]
+        + [pa.field(c, pa.string()) for c in COLUMNAS_EXPORT_SAP[1:]]
     )
-    if not reg:
-        raise HTTPException(status_code=404, detail="Registro no encontrado")
+    sumidero = _SumideroBytes()
+    writer = pq.ParquetWriter(sumidero, esquema, compression="snappy")
+    try:
+        bloque = []
+        for fila in filas:
+            bloque.append(fila)
+            if len(bloque) == lote:
+                writer.write_batch(_lote_arrow(pa, esquema, bloque))
+                bloque = []
+                yield sumidero.vaciar()
+        if bloque:
+            writer.write_batch(_lote_arrow(pa, esquema, bloque))
+    finally:
+        writer.close()
+    yield sumidero.vaciar()
+
+
+def _lote_arrow(pa, esquema, bloque: list[list]):
+    columnas = list(zip(*bloque))
+    return pa.record_batch(
+        [pa.array(columnas[0], pa.int64())]
+        + [pa.array(col, pa.string()) for col in columnas[1:]],
+        schema=esquema,
+    )
+
+
+@router.get("/sap/exportar")
+def exportar_sap(
+    ids: list[int] | None = Query(None, description="Registros puntuales (ej. la bandeja)"),
+    desde: date | None = Query(None, description="Fecha de registro desde (inclusive)"),
+    hasta: date | None = Query(None, description="Fecha de registro hasta (inclusive)"),
+    estado: str | None = Query(None, description="borrador / cerrado"),
+    formato: Literal["csv", "xlsx"] = Query("csv"),
+    db: Session = Depends(get_db_lectura),
+):
+    """
+    Exporta filas SAP-ready en un solo request (un SELECT sobre ope_proyeccion_sap,
+    sin joins), en vez de pedir /{id}/sap por cada registro.
+    """
+    if not ids and not desde and not hasta:
+        raise HTTPException(status_code=422, detail="Debes enviar ids o un rango de fechas (desde/hasta)")
 
-    fecha_txt = reg.fecha_registro.date().isoformat()
-
-    chofer = reg.chofer
-    veh = reg.vehiculo
-    tra = reg.transportista
-
-    fila = FilaSapRespuesta(
-        FECHA=fecha_txt,
-        O_BETA=safe_str(reg.o_beta),
-        BOOKING=safe_str(reg.booking),
-        AWB=safe_str(reg.awb),
-        MARCA=safe_str(veh.marca),
-        PLACAS=safe_str(veh.placas),
-        DNI=safe_str(chofer.dni),
-        CHOFER=chofer.nombre_para_sap,
-        LICENCIA=safe_str(chofer.licencia),
-        TERMOGRAFOS=safe_str(reg.termografos),
-        CODIGO_SAP=safe_str(tra.codigo_sap),
-        TRANSPORTISTA=safe_str(tra.nombre_transportista),
-        PS_BETA=safe_str(reg.ps_beta),
-        PS_ADUANA=safe_str(reg.ps_aduana),
-        PS_OPERADOR=safe_str(reg.ps_operador),
-        SENASA_PS_LINEA=safe_str(reg.senasa_ps_linea),
-        N_DAM=safe_str(reg.dam),
-        P_REGISTRAL=safe_str(tra.partida_registral),
-        CER_VEHICULAR=safe_str(veh.cert_vehicular),
+    stmt = consulta_sap(ids, desde, hasta, estado)
+    nombre = f"sap_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{formato}"
+
+    if formato == "csv":
+        return StreamingResponse(
+            csv_en_bloques(filas_export_sap(db, stmt)),
+            media_type="text/csv; charset=utf-8",
+            headers={"Content-Disposition": f'attachment; filename="{nombre}"'},
+        )
+
+    # XLSX: openpyxl write-only escribe fila por fila a disco (memoria acotada)
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("SAP")
+    ws.append(COLUMNAS_EXPORT_SAP)
+    for fila in filas_export_sap(db, stmt):
+        ws.append(fila)
+
+    tmp = tempfile.NamedTemporaryFile(prefix="sap_", suffix=".xlsx", delete=False)
+    tmp.close()
+    try:
+        wb.save(tmp.name)
+        return FileResponse(
+            tmp.name,
+            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            filename=nombre,
+            background=BackgroundTask(os.unlink, tmp.name),
+        )
+    except BaseException:
+        # Sin respuesta no corre el BackgroundTask: el temporal se borra aquí
+        os.unlink(tmp.name)
+        raise
+
+
+@router.get("/sap/stream")
+def stream_sap(
+    desde: date = Query(..., description="Fecha de registro desde (inclusive)"),
+    hasta: date = Query(..., description="Fecha de registro hasta (inclusive)"),
+    estado: str | None = Query(None, description="borrador / cerrado"),
+    formato: Literal["csv", "ndjson", "parquet"] = Query("csv"),
+    db: Session = Depends(get_db_lectura),
+):
+    """
+    Filas SAP-ready de todo un periodo (conciliación mensual), en streaming con cursor
+    del lado del servidor: memoria constante sin importar cuántos registros haya.
+    """
+    if hasta < desde:
+        raise HTTPException(status_code=422, detail="'hasta' no puede ser anterior a 'desde'")
+
+    filas = filas_export_sap(db, consulta_sap(desde=desde, hasta=hasta, estado=estado), lote=2000)
+    nombre = f"sap_{desde:%Y%m%d}_{hasta:%Y%m%d}.{formato}"
+    headers = {"Content-Disposition": f'attachment; filename="{nombre}"'}
+
+    if formato == "csv":
+        return StreamingResponse(csv_en_bloques(filas), media_type="text/csv; charset=utf-8", headers=headers)
+    if formato == "ndjson":
+        return StreamingResponse(ndjson_en_bloques(filas), media_type="application/x-ndjson", headers=headers)
+
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise HTTPException(status_code=500, detail="Falta instalar pyarrow para exportar Parquet")
+    return StreamingResponse(
+        parquet_en_bloques(filas), media_type="application/vnd.apache.parquet", headers=headers
     )
-    return fila
+
+
+@router.get("/{registro_id}/sap", response_model=FilaSapRespuesta)
+def obtener_fila_sap(registro_id: int, db: Session = Depends(get_db_lectura)):
+    r = db.execute(consulta_sap(ids=[registro_id])).first()
+    if not r:
+        raise HTTPException(status_code=404, detail="Registro no encontrado")
+
+    return FilaSapRespuesta(**dict(zip(COLUMNAS_SAP, r[1:])))
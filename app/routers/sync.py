@@ -1,10 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, Header
 from pydantic import BaseModel
 from typing import List, Optional
+from sqlalchemy import insert, select, update
 from sqlalchemy.orm import Session
 
-from app.database import get_db
+from app.database import get_db, sesion_adaptable
 from app.configuracion import settings
+from app.metricas import SYNC_FILAS_TOTAL
 from app.models.ref_posicionamiento import RefPosicionamiento
 from app.models.ref_booking_dam import RefBookingDam
 
@@ -24,6 +26,24 @@ def validar_token(x_sync_token: str | None):
         raise HTTPException(status_code=401, detail="Token de sync inválido")
 
 
+def ids_por_booking(db: Session, modelo, bookings: set[str], lote: int = 1000) -> dict[str, int]:
+    """Filas ya guardadas {booking: id}, en una consulta por cada `lote` bookings (no una por item)."""
+    ids = {}
+    lista = sorted(bookings)
+    for i in range(0, len(lista), lote):
+        for id_, booking in db.execute(select(modelo.id, modelo.booking).where(modelo.booking.in_(lista[i:i + lote]))):
+            ids[booking] = id_
+    return ids
+
+
+def guardar_upserts(db: Session, modelo, nuevos: dict[str, dict], cambios: dict[int, dict]) -> None:
+    # Un INSERT y un UPDATE (executemany por PK) para todo el lote
+    if nuevos:
+        db.execute(insert(modelo), list(nuevos.values()))
+    if cambios:
+        db.execute(update(modelo), list(cambios.values()))
+
+
 class PosicionamientoItem(BaseModel):
     booking: str
     o_beta: Optional[str] = None
@@ -36,6 +56,7 @@ class DamItem(BaseModel):
 
 
 @router.post("/posicionamiento")
+@sesion_adaptable
 def sync_posicionamiento(
     items: List[PosicionamientoItem],
     db: Session = Depends(get_db),
@@ -43,29 +64,33 @@ def sync_posicionamiento(
 ):
     validar_token(x_sync_token)
 
+    existentes = ids_por_booking(db, RefPosicionamiento, {b for it in items if (b := normalizar(it.booking))})
+    nuevos: dict[str, dict] = {}
+    cambios: dict[int, dict] = {}
+
     upserts = 0
     for it in items:
         booking = normalizar(it.booking)
         if not booking:
             continue
 
-        row = db.query(RefPosicionamiento).filter(RefPosicionamiento.booking == booking).first()
-        if row:
-            row.o_beta = normalizar(it.o_beta)
-            row.awb = normalizar(it.awb)
+        valores = {"o_beta": normalizar(it.o_beta), "awb": normalizar(it.awb)}
+        if booking in existentes:
+            cambios[existentes[booking]] = {"id": existentes[booking], **valores}
         else:
-            db.add(RefPosicionamiento(
-                booking=booking,
-                o_beta=normalizar(it.o_beta),
-                awb=normalizar(it.awb),
-            ))
+            # si el booking se repite en el mismo lote, gana el último
+            nuevos[booking] = {"booking": booking, **valores}
         upserts += 1
 
+    guardar_upserts(db, RefPosicionamiento, nuevos, cambios)
+
     db.commit()
+    SYNC_FILAS_TOTAL.labels(fuente="posicionamiento").inc(upserts)
     return {"ok": True, "upserts": upserts}
 
 
 @router.post("/dams")
+@sesion_adaptable
 def sync_dams(
     items: List[DamItem],
     db: Session = Depends(get_db),
@@ -73,6 +98,10 @@ def sync_dams(
 ):
     validar_token(x_sync_token)
 
+    existentes = ids_por_booking(db, RefBookingDam, {b for it in items if (b := normalizar(it.booking))})
+    nuevos: dict[str, dict] = {}
+    cambios: dict[int, dict] = {}
+
     upserts = 0
     for it in items:
         booking = normalizar(it.booking)
@@ -80,12 +109,14 @@ def sync_dams(
         if not booking or not dam:
             continue
 
-        row = db.query(RefBookingDam).filter(RefBookingDam.booking == booking).first()
-        if row:
-            row.dam = dam
+        if booking in existentes:
+            cambios[existentes[booking]] = {"id": existentes[booking], "dam": dam}
         else:
-            db.add(RefBookingDam(booking=booking, dam=dam))
+            nuevos[booking] = {"booking": booking, "dam": dam}
         upserts += 1
 
+    guardar_upserts(db, RefBookingDam, nuevos, cambios)
+
     db.commit()
+    SYNC_FILAS_TOTAL.labels(fuente="dams").inc(upserts)
     return {"ok": True, "upserts": upserts}
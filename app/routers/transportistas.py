@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import or_
-from app.database import get_db
+from app.database import get_db, get_db_lectura, sesion_adaptable
 from app.models.catalogos import Transportista
 from app.schemas.catalogos import TransportistaCrear, TransportistaRespuesta
+from app.utils.respuestas import DESCRIPCION_CAMPOS, respuesta_lista
 
 router = APIRouter(prefix="/api/v1/transportistas", tags=["Transportistas"])
 
@@ -24,12 +25,24 @@ def crear_transportista(payload: TransportistaCrear, db: Session = Depends(get_d
 
 
 @router.get("", response_model=list[TransportistaRespuesta])
-def listar_transportistas(db: Session = Depends(get_db), limit: int = 50, offset: int = 0):
-    return db.query(Transportista).order_by(Transportista.id.desc()).offset(offset).limit(limit).all()
+def listar_transportistas(
+    db: Session = Depends(get_db_lectura),
+    limit: int = 50,
+    offset: int = 0,
+    campos: str | None = Query(None, description=DESCRIPCION_CAMPOS),
+):
+    items = db.query(Transportista).order_by(Transportista.id.desc()).offset(offset).limit(limit).all()
+    return respuesta_lista(items, TransportistaRespuesta, campos)
 
 
 @router.get("/buscar", response_model=list[TransportistaRespuesta])
-def buscar(texto: str, db: Session = Depends(get_db), limit: int = 20):
+@sesion_adaptable
+def buscar(
+    texto: str,
+    db: Session = Depends(get_db_lectura),
+    limit: int = 20,
+    campos: str | None = Query(None, description=DESCRIPCION_CAMPOS),
+):
     """
     - Si 'texto' parece RUC (solo dígitos), busca exacto.
     - Si no, busca por nombre (contiene, case-insensitive).
@@ -44,4 +57,4 @@ def buscar(texto: str, db: Session = Depends(get_db), limit: int = 20):
 
     if not res:
         raise HTTPException(status_code=404, detail="No se encontraron transportistas")
-    return res
+    return respuesta_lista(res, TransportistaRespuesta, campos)
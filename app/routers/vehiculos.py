@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.database import get_db, get_db_lectura, sesion_adaptable
 from app.models.catalogos import Vehiculo
 from app.schemas.catalogos import VehiculoCrear, VehiculoRespuesta
+from app.utils.respuestas import DESCRIPCION_CAMPOS, respuesta_lista
 
 router = APIRouter(prefix="/api/v1/vehiculos", tags=["Vehículos"])
 
@@ -27,12 +28,19 @@ def crear_vehiculo(payload: VehiculoCrear, db: Session = Depends(get_db)):
 
 
 @router.get("", response_model=list[VehiculoRespuesta])
-def listar_vehiculos(db: Session = Depends(get_db), limit: int = 50, offset: int = 0):
-    return db.query(Vehiculo).order_by(Vehiculo.id.desc()).offset(offset).limit(limit).all()
+def listar_vehiculos(
+    db: Session = Depends(get_db_lectura),
+    limit: int = 50,
+    offset: int = 0,
+    campos: str | None = Query(None, description=DESCRIPCION_CAMPOS),
+):
+    items = db.query(Vehiculo).order_by(Vehiculo.id.desc()).offset(offset).limit(limit).all()
+    return respuesta_lista(items, VehiculoRespuesta, campos)
 
 
 @router.get("/buscar", response_model=VehiculoRespuesta)
-def buscar_por_placas(placas: str, db: Session = Depends(get_db)):
+@sesion_adaptable
+def buscar_por_placas(placas: str, db: Session = Depends(get_db_lectura)):
     veh = db.query(Vehiculo).filter(Vehiculo.placas == placas).first()
     if not veh:
         raise HTTPException(status_code=404, detail="Vehículo no encontrado")
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from typing import Optional
-from datetime import datetime
+from datetime import date, datetime
 
 
 class RegistroCrear(BaseModel):
@@ -37,6 +37,54 @@ class RegistroRespuesta(BaseModel):
         from_attributes = True
 
 
+class RegistroResumen(BaseModel):
+    id: int
+    fecha_registro: datetime
+    estado: str
+    o_beta: Optional[str] = None
+    booking: Optional[str] = None
+    awb: Optional[str] = None
+    termografos: Optional[str] = None
+    ps_beta: Optional[str] = None
+    chofer_id: int
+    vehiculo_id: int
+    transportista_id: int
+
+    class Config:
+        from_attributes = True
+
+
+class RegistroPagina(BaseModel):
+    items: list[RegistroResumen]
+    # Cursor opaco para pedir la página siguiente (None = no hay más)
+    siguiente: Optional[str] = None
+
+
+class UnicoEncontrado(BaseModel):
+    tipo: str
+    valor: str
+    vigente: bool
+    fecha_uso: Optional[datetime] = None
+    registro: RegistroResumen
+
+
+class CierreLote(BaseModel):
+    # Uno de los dos: ids puntuales o "todos los borradores hasta tal fecha"
+    ids: Optional[list[int]] = Field(None, max_length=5000)
+    hasta: Optional[date] = Field(None, description="Cierra los borradores con fecha_registro <= hasta")
+
+
+class ResultadoCierre(BaseModel):
+    id: int
+    estado: str  # cerrado / ya estaba cerrado / no encontrado
+    awbs_liberados: int = 0
+
+
+class CierreLoteRespuesta(BaseModel):
+    cerrados: int
+    resultados: list[ResultadoCierre]
+
+
 class FilaSapRespuesta(BaseModel):
     FECHA: str
     O_BETA: str
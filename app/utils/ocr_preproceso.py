@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+# OpenCV / numpy / PIL se importan dentro de cada función: cargarlos cuesta cientos de ms
+# y solo hacen falta al OCR-ear, no al arrancar la app (cold start en Render)
+if TYPE_CHECKING:
+    import numpy as np
+    from PIL import Image
+
+
+@dataclass(frozen=True)
+class ConfigPreproceso:
+    """
+    Pasos del preproceso previo a Tesseract (en este orden):
+    - limitar el lado mayor (protege contra fotos de 12+ MP)
+    - reescalar para que los caracteres midan ~altura_caracter px
+    - enderezar (deskew) hasta max_angulo grados
+    - recortar a las regiones con texto
+    - umbral adaptativo (binarización local)
+    Cualquier paso se apaga con None/False.
+    """
+    max_lado: int | None = 2400
+    altura_caracter: int | None = 32
+    max_escala: float = 2.0  # recortes chicos se amplían como máximo x2
+    enderezar: bool = True
+    max_angulo: float = 15.0
+    recortar_texto: bool = True
+    margen_recorte: int = 12
+    umbral_adaptativo: bool = True
+    bloque_umbral: int = 31
+    c_umbral: int = 15
+
+
+# Config por tipo de dato (claves = TipoOCR)
+PREPROCESO_POR_TIPO: dict[str, ConfigPreproceso] = {
+    # Foto del DNI: suele venir inclinada y con fondo de color
+    "DNI": ConfigPreproceso(),
+    # Etiquetas de precinto / termógrafo: fotos de campo, texto corto
+    "PS_BETA": ConfigPreproceso(bloque_umbral=41),
+    "TERMOGRAFO": ConfigPreproceso(bloque_umbral=41),
+    # Booking / O_BETA: capturas o PDF limpios -> sin umbral (ya son nítidos)
+    "BOOKING": ConfigPreproceso(umbral_adaptativo=False),
+    "O_BETA": ConfigPreproceso(umbral_adaptativo=False),
+    # AWB: recortes de pantalla o foto del contenedor
+    "AWB": ConfigPreproceso(),
+}
+
+
+def _binarizar_inv(gris: np.ndarray) -> np.ndarray:
+    import cv2
+
+    # Otsu invertido: texto (oscuro) -> 255, fondo -> 0
+    _, binaria = cv2.threshold(gris, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    return binaria
+
+
+def limitar_lado(gris: np.ndarray, max_lado: int) -> np.ndarray:
+    import cv2
+
+    h, w = gris.shape[:2]
+    lado = max(h, w)
+    if lado <= max_lado:
+        return gris
+    escala = max_lado / lado
+    return cv2.resize(gris, None, fx=escala, fy=escala, interpolation=cv2.INTER_AREA)
+
+
+def estimar_altura_caracter(gris: np.ndarray) -> float | None:
+    """
+    Mediana de la altura de los componentes conexos con forma de carácter.
+    Retorna None si no hay suficientes para una estimación confiable.
+    """
+    import cv2
+    import numpy as np
+
+    _, _, stats, _ = cv2.connectedComponentsWithStats(_binarizar_inv(gris), connectivity=8)
+    anchos = stats[1:, cv2.CC_STAT_WIDTH]
+    altos = stats[1:, cv2.CC_STAT_HEIGHT]
+    areas = stats[1:, cv2.CC_STAT_AREA]
+
+    mascara = (altos >= 6) & (altos <= gris.shape[0] * 0.5) & (anchos <= altos * 3) & (areas >= 12)
+    if int(mascara.sum()) < 5:
+        return None
+    return float(np.median(altos[mascara]))
+
+
+def reescalar_a_altura(gris: np.ndarray, altura_objetivo: int, max_escala: float) -> np.ndarray:
+    import cv2
+
+    altura = estimar_altura_caracter(gris)
+    if not altura:
+        return gris
+
+    escala = min(altura_objetivo / altura, max_escala)
+    if abs(escala - 1.0) < 0.1:
+        return gris
+
+    interp = cv2.INTER_AREA if escala < 1 else cv2.INTER_CUBIC
+    return cv2.resize(gris, None, fx=escala, fy=escala, interpolation=interp)
+
+
+def _rotar(img: np.ndarray, angulo: float, borde: int) -> np.ndarray:
+    import cv2
+
+    h, w = img.shape[:2]
+    m = cv2.getRotationMatrix2D((w / 2, h / 2), angulo, 1.0)
+    return cv2.warpAffine(
+        img, m, (w, h), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_CONSTANT, borderValue=borde
+    )
+
+
+def _nitidez_filas(binaria: np.ndarray) -> float:
+    import numpy as np
+
+    # Texto horizontal => perfil por filas con picos marcados (varianza alta)
+    return float(np.var(binaria.sum(axis=1, dtype=np.float64)))
+
+
+def enderezar(gris: np.ndarray, max_angulo: float) -> np.ndarray:
+    import cv2
+
+    binaria = _binarizar_inv(gris)
+    puntos = cv2.findNonZero(binaria)
+    if puntos is None or len(puntos) < 50:
+        return gris
+
+    angulo = cv2.minAreaRect(puntos)[-1]
+    # La convención de minAreaRect cambia entre versiones de OpenCV: normalizamos a [-45, 45]
+    if angulo > 45:
+        angulo -= 90
+    elif angulo < -45:
+        angulo += 90
+    if abs(angulo) < 0.5 or abs(angulo) > max_angulo:
+        return gris
+
+    # El signo tampoco es estable entre versiones: probamos ambos en una miniatura
+    muestra = limitar_lado(binaria, 800)
+    angulo = max((angulo, -angulo), key=lambda a: _nitidez_filas(_rotar(muestra, a, 0)))
+
+    return _rotar(gris, angulo, 255)
+
+
+def recortar_a_texto(gris: np.ndarray, margen: int) -> np.ndarray:
+    import cv2
+
+    h, w = gris.shape[:2]
+    binaria = _binarizar_inv(gris)
+
+    # Unimos caracteres en bloques de texto antes de buscar contornos
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (max(3, w // 50), max(3, h // 100)))
+    bloques = cv2.dilate(binaria, kernel, iterations=2)
+    contornos, _ = cv2.findContours(bloques, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    area_min = h * w * 0.0005
+    cajas = []
+    for c in contornos:
+        x, y, cw, ch = cv2.boundingRect(c)
+        if cw * ch < area_min:
+            continue  # ruido
+        if cw >= w * 0.98 and ch >= h * 0.98:
+            continue  # marco / borde de la foto
+        cajas.append((x, y, x + cw, y + ch))
+
+    if not cajas:
+        return gris
+
+    x0 = max(0, min(c[0] for c in cajas) - margen)
+    y0 = max(0, min(c[1] for c in cajas) - margen)
+    x1 = min(w, max(c[2] for c in cajas) + margen)
+    y1 = min(h, max(c[3] for c in cajas) + margen)
+
+    if (x1 - x0) * (y1 - y0) >= h * w * 0.95:
+        return gris
+    return gris[y0:y1, x0:x1]
+
+
+def umbral_adaptativo(gris: np.ndarray, bloque: int, c: int) -> np.ndarray:
+    import cv2
+
+    bloque = max(3, bloque | 1)  # impar y >= 3
+    return cv2.adaptiveThreshold(
+        gris, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, bloque, c
+    )
+
+
+def preprocesar(img: Image.Image, cfg: ConfigPreproceso) -> Image.Image:
+    import numpy as np
+    from PIL import Image
+
+    gris = np.asarray(img.convert("L"))
+
+    if cfg.max_lado:
+        gris = limitar_lado(gris, cfg.max_lado)
+    if cfg.altura_caracter:
+        gris = reescalar_a_altura(gris, cfg.altura_caracter, cfg.max_escala)
+    if cfg.enderezar:
+        gris = enderezar(gris, cfg.max_angulo)
+    if cfg.recortar_texto:
+        gris = recortar_a_texto(gris, cfg.margen_recorte)
+    if cfg.umbral_adaptativo:
+        gris = umbral_adaptativo(gris, cfg.bloque_umbral, cfg.c_umbral)
+
+    return Image.fromarray(gris)
@@ -0,0 +1,142 @@
+"""
+Mantenimiento de la proyección SAP (ope_proyeccion_sap).
+
+La fila SAP se arma una sola vez al escribir (crear / cerrar registro, o cuando cambia
+un chofer, vehículo o transportista del que depende) y las lecturas solo la copian.
+Un listener after_flush sobre Session detecta esos cambios, así ningún endpoint
+tiene que acordarse de refrescarla. Para UPDATE masivos (que no pasan por el flush)
+llamar a refrescar_proyeccion_sap() a mano.
+"""
+from sqlalchemy import delete, event, select
+from sqlalchemy.orm import Session
+
+from app.models.catalogos import Chofer, Vehiculo, Transportista, nombre_sap
+from app.models.operacion import RegistroOperativo
+from app.models.proyeccion_sap import ProyeccionSap
+from app.schemas.operacion import FilaSapRespuesta
+
+# Claves SAP (FECHA, O_BETA, ...) -> columna de la proyección (fecha, o_beta, ...)
+COLUMNAS_SAP = list(FilaSapRespuesta.model_fields)
+
+
+def safe_str(x) -> str:
+    return (x or "").strip()
+
+
+def consulta_fuente_sap():
+    """Registro + catálogos con las columnas que necesita la fila SAP (sin filtros)."""
+    return (
+        select(
+            RegistroOperativo.id,
+            RegistroOperativo.fecha_registro,
+            RegistroOperativo.estado,
+            RegistroOperativo.chofer_id,
+            RegistroOperativo.vehiculo_id,
+            RegistroOperativo.transportista_id,
+            RegistroOperativo.o_beta,
+            RegistroOperativo.booking,
+            RegistroOperativo.awb,
+            RegistroOperativo.termografos,
+            RegistroOperativo.ps_beta,
+            RegistroOperativo.ps_aduana,
+            RegistroOperativo.ps_operador,
+            RegistroOperativo.senasa_ps_linea,
+            RegistroOperativo.dam,
+            Chofer.dni,
+            Chofer.primer_nombre,
+            Chofer.apellido_paterno,
+            Chofer.apellido_materno,
+            Chofer.licencia,
+            Vehiculo.marca,
+            Vehiculo.placas,
+            Vehiculo.cert_vehicular,
+            Transportista.codigo_sap,
+            Transportista.nombre_transportista,
+            Transportista.partida_registral,
+        )
+        .join(Chofer, RegistroOperativo.chofer_id == Chofer.id)
+        .join(Vehiculo, RegistroOperativo.vehiculo_id == Vehiculo.id)
+        .join(Transportista, RegistroOperativo.transportista_id == Transportista.id)
+    )
+
+
+def fila_sap(r) -> dict:
+    """Fila SAP-ready (mismas columnas que FilaSapRespuesta) desde una fila de consulta_fuente_sap."""
+    return {
+        "FECHA": r.fecha_registro.date().isoformat(),
+        "O_BETA": safe_str(r.o_beta),
+        "BOOKING": safe_str(r.booking),
+        "AWB": safe_str(r.awb),
+        "MARCA": safe_str(r.marca),
+        "PLACAS": safe_str(r.placas),
+        "DNI": safe_str(r.dni),
+        "CHOFER": nombre_sap(r.primer_nombre, r.apellido_paterno, r.apellido_materno),
+        "LICENCIA": safe_str(r.licencia),
+        "TERMOGRAFOS": safe_str(r.termografos),
+        "CODIGO_SAP": safe_str(r.codigo_sap),
+        "TRANSPORTISTA": safe_str(r.nombre_transportista),
+        "PS_BETA": safe_str(r.ps_beta),
+        "PS_ADUANA": safe_str(r.ps_aduana),
+        "PS_OPERADOR": safe_str(r.ps_operador),
+        "SENASA_PS_LINEA": safe_str(r.senasa_ps_linea),
+        "N_DAM": safe_str(r.dam),
+        "P_REGISTRAL": safe_str(r.partida_registral),
+        "CER_VEHICULAR": safe_str(r.cert_vehicular),
+    }
+
+
+def fila_proyeccion(r) -> dict:
+    fila = {
+        "registro_id": r.id,
+        "fecha_registro": r.fecha_registro,
+        "estado": r.estado,
+        "chofer_id": r.chofer_id,
+        "vehiculo_id": r.vehiculo_id,
+        "transportista_id": r.transportista_id,
+    }
+    fila.update({k.lower(): v for k, v in fila_sap(r).items()})
+    return fila
+
+
+def refrescar_proyeccion_sap(db: Session, condicion, lote: int = 1000) -> int:
+    """
+    Reescribe las filas de la proyección de los registros que cumplen `condicion`
+    (expresión sobre RegistroOperativo / catálogos). Retorna cuántas filas escribió.
+    Corre en la conexión/transacción de la sesión: se confirma junto con el cambio.
+    """
+    conn = db.connection()
+    tabla = ProyeccionSap.__table__
+    total = 0
+
+    resultado = conn.execute(consulta_fuente_sap().where(condicion).execution_options(yield_per=lote))
+    for filas in resultado.partitions():
+        ids = [r.id for r in filas]
+        conn.execute(delete(tabla).where(tabla.c.registro_id.in_(ids)))
+        conn.execute(tabla.insert(), [fila_proyeccion(r) for r in filas])
+        total += len(filas)
+    return total
+
+
+# Catálogo -> FK en el registro: si cambia el catálogo, se refrescan sus registros
+_DEPENDENCIAS = (
+    (Chofer, RegistroOperativo.chofer_id),
+    (Vehiculo, RegistroOperativo.vehiculo_id),
+    (Transportista, RegistroOperativo.transportista_id),
+)
+
+
+@event.listens_for(Session, "after_flush")
+def _mantener_proyeccion(session: Session, flush_context) -> None:
+    # En after_flush new/dirty/deleted todavía reflejan lo que se acaba de escribir
+    registros = [
+        o.id
+        for o in (*session.new, *session.dirty)
+        if isinstance(o, RegistroOperativo) and (o in session.new or session.is_modified(o))
+    ]
+    if registros:
+        refrescar_proyeccion_sap(session, RegistroOperativo.id.in_(registros))
+
+    for modelo, fk in _DEPENDENCIAS:
+        ids = [o.id for o in session.dirty if isinstance(o, modelo) and session.is_modified(o)]
+        if ids:
+            refrescar_proyeccion_sap(session, fk.in_(ids))
@@ -0,0 +1,165 @@
+"""
+Serialización y compresión de respuestas.
+
+- Las respuestas JSON van con orjson (default_response_class en app/main.py).
+- respuesta_lista(): para listados grandes. Valida las filas ORM una sola vez contra
+  el schema y las serializa directo a bytes con pydantic-core, sin la segunda
+  validación + jsonable_encoder que FastAPI hace con response_model.
+- ?campos=id,dni: devuelve solo esos campos (parsear_campos / filtrar_campos).
+- MiddlewareCompresion: brotli o gzip según Accept-Encoding (respetando q=0), desde COMPRESION_MIN_BYTES.
+"""
+from __future__ import annotations
+
+import functools
+
+from fastapi import HTTPException
+from fastapi.responses import Response
+from pydantic import BaseModel, TypeAdapter
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipResponder, IdentityResponder
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.configuracion import settings
+
+DESCRIPCION_CAMPOS = "Solo estos campos, separados por coma (ej: id,dni). Sin valor: todos."
+
+
+def parsear_campos(campos: str | None, permitidos) -> set[str] | None:
+    """'id, dni' -> {'id', 'dni'}; 422 si pide un campo que no existe. None = todos."""
+    if not campos:
+        return None
+    pedidos = {c.strip() for c in campos.split(",") if c.strip()}
+    desconocidos = pedidos - set(permitidos)
+    if desconocidos:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Campos desconocidos: {', '.join(sorted(desconocidos))}. Permitidos: {', '.join(permitidos)}",
+        )
+    return pedidos or None
+
+
+def filtrar_campos(datos: dict, campos: str | None) -> dict:
+    """?campos= sobre una respuesta que ya es dict (p. ej. el resultado OCR)."""
+    pedidos = parsear_campos(campos, list(datos))
+    return {k: v for k, v in datos.items() if k in pedidos} if pedidos else datos
+
+
+@functools.cache
+def adaptador_lista(esquema: type[BaseModel]) -> TypeAdapter:
+    # Construir un TypeAdapter compila el validador: una vez por schema y proceso
+    return TypeAdapter(list[esquema])
+
+
+def respuesta_lista(filas, esquema: type[BaseModel], campos: str | None = None) -> Response:
+    """Lista de filas ORM -> JSON (una validación from_attributes + dump_json en Rust)."""
+    incluir = parsear_campos(campos, list(esquema.model_fields))
+    adaptador = adaptador_lista(esquema)
+    items = adaptador.validate_python(filas, from_attributes=True)
+    cuerpo = adaptador.dump_json(items, include={"__all__": incluir} if incluir else None)
+    return Response(cuerpo, media_type="application/json")
+
+
+# ---------- compresión ----------
+
+# Ya comprimidos o que no deben retenerse (SSE). XLSX/DOCX (OOXML) ya son un zip.
+TIPOS_SIN_COMPRESION = (
+    "text/event-stream",
+    "application/vnd.apache.parquet",
+    "application/vnd.openxmlformats-officedocument.",
+    "image/",
+    "application/zip",
+)
+
+
+class _ExcluirTipos:
+    async def send_with_compression(self, message: Message) -> None:
+        await super().send_with_compression(message)
+        if message["type"] == "http.response.start":
+            tipo = Headers(raw=message["headers"]).get("content-type", "")
+            self.content_type_is_excluded |= tipo.startswith(TIPOS_SIN_COMPRESION)
+
+
+class _Gzip(_ExcluirTipos, GZipResponder):
+    def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        self.gzip_file.write(body)
+        if more_body:
+            # En streaming cada bloque sale ya (progreso NDJSON del lote OCR, exportaciones)
+            self.gzip_file.flush()
+        else:
+            self.gzip_file.close()
+        body = self.gzip_buffer.getvalue()
+        self.gzip_buffer.seek(0)
+        self.gzip_buffer.truncate()
+        return body
+
+
+class _Brotli(_ExcluirTipos, IdentityResponder):
+    content_encoding = "br"
+
+    def __init__(self, app: ASGIApp, minimum_size: int, calidad: int) -> None:
+        import brotli
+
+        super().__init__(app, minimum_size)
+        self.compresor = brotli.Compressor(quality=calidad)
+
+    def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        comprimido = self.compresor.process(body)
+        return comprimido + (self.compresor.flush() if more_body else self.compresor.finish())
+
+
+@functools.cache
+def hay_brotli() -> bool:
+    try:
+        import brotli  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def codificaciones_aceptadas(accept_encoding: str) -> dict[str, float]:
+    """'br;q=0, gzip' -> {'br': 0.0, 'gzip': 1.0}. Un q inválido cuenta como 0."""
+    pesos: dict[str, float] = {}
+    for parte in accept_encoding.split(","):
+        nombre, *parametros = (p.strip() for p in parte.split(";"))
+        if not nombre:
+            continue
+        q = 1.0
+        for parametro in parametros:
+            clave, _, valor = parametro.partition("=")
+            if clave.strip().lower() == "q":
+                try:
+                    q = float(valor)
+                except ValueError:
+                    q = 0.0
+        pesos[nombre.lower()] = q
+    return pesos
+
+
+def acepta(pesos: dict[str, float], codificacion: str) -> bool:
+    # Sin mención explícita vale lo que diga "*" (si tampoco está, no se acepta)
+    return pesos.get(codificacion, pesos.get("*", 0.0)) > 0
+
+
+class MiddlewareCompresion:
+    """
+    Como GZipMiddleware de Starlette, pero negocia brotli (si está instalado y el
+    cliente lo acepta) antes que gzip, usa un nivel rápido y no comprime Parquet/imágenes.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        pesos = codificaciones_aceptadas(Headers(scope=scope).get("accept-encoding", ""))
+        minimo = settings.COMPRESION_MIN_BYTES
+        if acepta(pesos, "br") and hay_brotli():
+            responder = _Brotli(self.app, minimo, settings.COMPRESION_CALIDAD_BROTLI)
+        elif acepta(pesos, "gzip"):
+            responder = _Gzip(self.app, minimo, compresslevel=settings.COMPRESION_NIVEL_GZIP)
+        else:
+            responder = IdentityResponder(self.app, minimo)
+        await responder(scope, receive, send)
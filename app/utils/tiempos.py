@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Iterator
+
+
+class Cronometro:
+    """Acumula la duración (ms) de cada etapa de un request."""
+
+    def __init__(self) -> None:
+        self.etapas: dict[str, float] = {}
+
+    def sumar(self, nombre: str, ms: float) -> None:
+        self.etapas[nombre] = self.etapas.get(nombre, 0.0) + ms
+
+    @contextmanager
+    def etapa(self, nombre: str) -> Iterator[None]:
+        t0 = perf_counter()
+        try:
+            yield
+        finally:
+            self.sumar(nombre, (perf_counter() - t0) * 1000)
+
+    def server_timing(self) -> str:
+        # Formato del header Server-Timing: "etapa;dur=12.3, otra;dur=4.0"
+        return ", ".join(f"{n};dur={ms:.1f}" for n, ms in self.etapas.items())
+
+
+# Cronómetro del request en curso. run_in_threadpool y create_task copian el contexto,
+# así que las funciones bloqueantes lo ven sin pasarlo por parámetro.
+cronometro_actual: ContextVar[Cronometro | None] = ContextVar("cronometro_actual", default=None)
+
+
+@contextmanager
+def etapa(nombre: str) -> Iterator[None]:
+    """Mide `nombre` en el cronómetro actual (no hace nada si no hay uno)."""
+    crono = cronometro_actual.get()
+    if crono is None:
+        yield
+        return
+    with crono.etapa(nombre):
+        yield
@@ -0,0 +1,141 @@
+"""
+Costo de arranque: cuánto tarda `import app.main` (lo que paga cada cold start antes
+del primer request) y qué módulos se llevan ese tiempo, con `python -X importtime`
+en un proceso nuevo por repetición.
+
+Reporta:
+- tiempo total de import de la app (mediana de las repeticiones)
+- los paquetes de primer nivel más caros (suma del tiempo propio de sus módulos)
+- los módulos más caros (tiempo acumulado, incluye lo que importan)
+- el costo de las dependencias OCR, que deben cargarse recién en el primer OCR:
+  si alguna aparece al importar la app sale con código 1 (sirve como paso de CI)
+
+Uso (desde la raíz del repo, con el mismo .env que la app):
+
+    python -m benchmarks.arranque
+    python -m benchmarks.arranque --repeticiones 7 --top 25 --json arranque.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+# Dependencias que solo usa /ocr: no deben importarse al arrancar
+DEPENDENCIAS_OCR = ("PIL.Image", "pytesseract", "pdf2image", "cv2", "numpy")
+
+
+def importtime(codigo: str) -> tuple[float, dict[str, tuple[int, int]]]:
+    """
+    Corre `codigo` en un intérprete nuevo con -X importtime.
+    Retorna (ms de pared del proceso, {módulo: (us propios, us acumulados)}).
+    """
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", codigo], capture_output=True, text=True
+    )
+    pared_ms = (time.perf_counter() - t0) * 1000
+    if proc.returncode != 0:
+        raise RuntimeError(f"Falló `{codigo}`:\n{proc.stderr[-2000:]}")
+
+    modulos = {}
+    for linea in proc.stderr.splitlines():
+        # "import time:  self [us] | cumulative | imported package"
+        if not linea.startswith("import time:") or "self [us]" in linea:
+            continue
+        propio, acumulado, nombre = linea[len("import time:"):].split("|")
+        modulos[nombre.strip()] = (int(propio), int(acumulado))
+    return pared_ms, modulos
+
+
+def mediana_por_clave(corridas: list[dict[str, float]]) -> dict[str, float]:
+    claves = set().union(*corridas)
+    return {k: statistics.median(c.get(k, 0.0) for c in corridas) for k in claves}
+
+
+def medir(modulo: str, repeticiones: int) -> dict:
+    paredes, totales, por_paquete, por_modulo = [], [], [], []
+    cargados: set[str] = set()
+    for _ in range(repeticiones):
+        pared_ms, modulos = importtime(f"import {modulo}")
+        paredes.append(pared_ms)
+        totales.append(modulos.get(modulo, (0, 0))[1] / 1000)
+        por_modulo.append({m: acum / 1000 for m, (_, acum) in modulos.items()})
+        paquetes: dict[str, float] = {}
+        for m, (propio, _) in modulos.items():
+            raiz = m.split(".")[0]
+            paquetes[raiz] = paquetes.get(raiz, 0.0) + propio / 1000
+        por_paquete.append(paquetes)
+        cargados |= set(modulos)
+
+    return {
+        "modulo": modulo,
+        "repeticiones": repeticiones,
+        "proceso_ms": statistics.median(paredes),
+        "import_ms": statistics.median(totales),
+        "paquetes_ms": mediana_por_clave(por_paquete),
+        "modulos_ms": mediana_por_clave(por_modulo),
+        "ocr_al_arrancar": sorted(cargados & set(DEPENDENCIAS_OCR)),
+    }
+
+
+def costo_ocr(repeticiones: int) -> dict[str, float]:
+    """Lo que se paga en el primer OCR, por dependencia (import aislado)."""
+    costos = {}
+    for dep in DEPENDENCIAS_OCR:
+        ms = []
+        for _ in range(repeticiones):
+            try:
+                _, modulos = importtime(f"import {dep}")
+            except RuntimeError:
+                break  # no instalada en este entorno
+            ms.append(modulos.get(dep, (0, 0))[1] / 1000)
+        if ms:
+            costos[dep] = statistics.median(ms)
+    return costos
+
+
+def imprimir(resultado: dict, ocr: dict[str, float], top: int) -> None:
+    print(f"import {resultado['modulo']}: {resultado['import_ms']:.0f} ms "
+          f"(proceso completo {resultado['proceso_ms']:.0f} ms, mediana de {resultado['repeticiones']})")
+
+    print(f"\n{'PAQUETE':<32}{'MS PROPIOS':>12}")
+    for nombre, ms in sorted(resultado["paquetes_ms"].items(), key=lambda x: -x[1])[:top]:
+        print(f"{nombre:<32}{ms:>12.1f}")
+
+    print(f"\n{'MÓDULO':<48}{'MS ACUMULADOS':>15}")
+    for nombre, ms in sorted(resultado["modulos_ms"].items(), key=lambda x: -x[1])[:top]:
+        print(f"{nombre:<48}{ms:>15.1f}")
+
+    print(f"\n{'DEPENDENCIA OCR':<20}{'MS':>8}  AL ARRANCAR")
+    for dep in DEPENDENCIAS_OCR:
+        ms = f"{ocr[dep]:.1f}" if dep in ocr else "-"
+        print(f"{dep:<20}{ms:>8}  {'SÍ' if dep in resultado['ocr_al_arrancar'] else 'no'}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modulo", default="app.main", help="Módulo a importar (el que carga uvicorn)")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="Filas por tabla")
+    parser.add_argument("--json", type=Path, default=None, help="Guardar resultados en JSON")
+    args = parser.parse_args()
+
+    resultado = medir(args.modulo, args.repeticiones)
+    ocr = costo_ocr(args.repeticiones)
+    imprimir(resultado, ocr, args.top)
+
+    if args.json:
+        args.json.write_text(json.dumps({**resultado, "costo_ocr_ms": ocr}, indent=2), encoding="utf-8")
+
+    if resultado["ocr_al_arrancar"]:
+        print(f"\nERROR: {', '.join(resultado['ocr_al_arrancar'])} se importa(n) al arrancar la app")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
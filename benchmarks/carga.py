@@ -0,0 +1,326 @@
+"""
+Prueba de carga de los endpoints calientes: latencia p50/p95/p99 y requests/s por
+escenario. Sirve para comparar DB_ASYNC=false (Session sync en el threadpool) contra
+DB_ASYNC=true (AsyncSession) con la misma cantidad de workers, y una corrida contra
+otra guardada (--baseline) antes de un deploy.
+
+Escenarios (se reparten en round-robin entre los clientes):
+- ref: GET /api/v1/ref/booking/{booking}
+- chofer: GET /api/v1/choferes/buscar?dni=...
+- crear: POST /api/v1/registros con valores únicos nuevos en cada request
+- awb: POST /api/v1/registros donde cada --awb-contencion requests seguidos piden el
+  mismo AWB: compiten por el candado, uno gana y el resto recibe 409 (esperado,
+  se cuenta aparte como conflicto)
+- sync: POST /api/v1/sync/posicionamiento con lotes de --lote-sync bookings
+  (mitad existentes -> update, mitad nuevos -> insert). Necesita --sync-token o SYNC_TOKEN
+- ocr: POST /api/v1/ocr/extraer con --archivo-ocr (tipo --tipo-ocr)
+
+Datos: por defecto usa un solo chofer / vehículo / transportista / booking (--dni,
+--placas, --ruc, --booking). Con una base sembrada por benchmarks.sembrar, pasar
+--choferes / --vehiculos / --transportistas / --refs con los mismos volúmenes y cada
+request elige filas al azar (más realista para caches e índices).
+
+Uso (desde la raíz del repo):
+
+    # levanta uvicorn una vez por modo (mismos --workers) y mide cada uno
+    python -m benchmarks.carga --modos sync,async --workers 2 --concurrencia 32 --duracion 20
+
+    # contra un servidor ya levantado, base sembrada, guardando y comparando
+    python -m benchmarks.carga --url http://localhost:8000 --escenarios ref,chofer,crear,awb,sync \\
+        --choferes 5000 --vehiculos 5000 --transportistas 1000 --refs 100000 \\
+        --json actual.json --baseline main.json --tolerancia 10
+
+Con --baseline sale con código 1 si algún escenario empeora su p95 o sus
+requests/s más que --tolerancia (%).
+
+El cliente usa hilos + requests: con concurrencias muy altas el propio cliente
+puede ser el cuello de botella (correrlo en otra máquina en ese caso).
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import requests
+
+from benchmarks.comun import percentil
+from benchmarks.sembrar import booking_ref, dni, placas, ruc
+
+ESCENARIOS = ("ref", "chofer", "crear", "awb", "sync", "ocr")
+MODOS = {"sync": "false", "async": "true"}
+# Respuestas esperadas que no son error: la pelea por el AWB termina en 409 para los perdedores
+CONFLICTO_ESPERADO = {"awb": 409}
+
+_contador_awb = itertools.count()
+
+
+def elegir(fijo: str, volumen: int, formato) -> str:
+    """Valor fijo (--dni, ...) o uno al azar entre los sembrados si se pasó el volumen."""
+    return formato(random.randint(1, volumen)) if volumen else fijo
+
+
+def payload_registro(args, awb: str) -> dict:
+    u = uuid.uuid4().hex[:10].upper()
+    return {
+        "booking": f"BK{u}",
+        "awb": awb,
+        "dni": elegir(args.dni, args.choferes, dni),
+        "placas": elegir(args.placas, args.vehiculos, placas),
+        "ruc": elegir(args.ruc, args.transportistas, ruc),
+        "termografos": f"T{u}",
+        "ps_beta": f"PS{u}",
+    }
+
+
+def peticion(sesion: requests.Session, base: str, escenario: str, args) -> requests.Response:
+    if escenario == "ref":
+        return sesion.get(f"{base}/api/v1/ref/booking/{elegir(args.booking, args.refs, booking_ref)}", timeout=30)
+    if escenario == "chofer":
+        return sesion.get(
+            f"{base}/api/v1/choferes/buscar", params={"dni": elegir(args.dni, args.choferes, dni)}, timeout=30
+        )
+    if escenario == "awb":
+        # AWB compartido por cada bloque de --awb-contencion requests (prefijo por corrida)
+        awb = f"{args.prefijo_awb}{next(_contador_awb) // args.awb_contencion:07d}"
+        return sesion.post(f"{base}/api/v1/registros", json=payload_registro(args, awb), timeout=30)
+    if escenario == "sync":
+        lote = []
+        for _ in range(args.lote_sync):
+            u = uuid.uuid4().hex[:8].upper()
+            existente = args.refs and random.random() < 0.5
+            lote.append({
+                "booking": booking_ref(random.randint(1, args.refs)) if existente else f"BKN{u}",
+                "o_beta": f"OB{u}",
+                "awb": f"AWS{u}",
+            })
+        return sesion.post(
+            f"{base}/api/v1/sync/posicionamiento", json=lote, headers={"x-sync-token": args.sync_token}, timeout=60
+        )
+    if escenario == "ocr":
+        with open(args.archivo_ocr, "rb") as f:
+            return sesion.post(
+                f"{base}/api/v1/ocr/extraer",
+                params={"tipo": args.tipo_ocr},
+                files={"archivo": (args.archivo_ocr.name, f)},
+                timeout=120,
+            )
+
+    return sesion.post(f"{base}/api/v1/registros", json=payload_registro(args, f"AWB{uuid.uuid4().hex[:10].upper()}"), timeout=30)
+
+
+def cliente(base: str, escenarios: list[str], args, hasta: float, inicio: int, muestras: list, lock) -> None:
+    sesion = requests.Session()
+    locales = []
+    # cada cliente arranca en un escenario distinto para mezclar la carga
+    for escenario in itertools.islice(itertools.cycle(escenarios), inicio, None):
+        if time.perf_counter() >= hasta:
+            break
+        t0 = time.perf_counter()
+        try:
+            codigo = peticion(sesion, base, escenario, args).status_code
+        except requests.RequestException:
+            codigo = 0  # timeout / conexión rechazada
+        locales.append((escenario, (time.perf_counter() - t0) * 1000, codigo))
+    with lock:
+        muestras.extend(locales)
+
+
+def medir(base: str, escenarios: list[str], args) -> list[dict]:
+    muestras: list[tuple[str, float, int]] = []
+    lock = threading.Lock()
+    t0 = time.perf_counter()
+    hasta = t0 + args.duracion
+    with ThreadPoolExecutor(max_workers=args.concurrencia) as pool:
+        for i in range(args.concurrencia):
+            pool.submit(cliente, base, escenarios, args, hasta, i, muestras, lock)
+    segundos = time.perf_counter() - t0
+
+    resumen = []
+    for escenario in escenarios:
+        rs = [m for m in muestras if m[0] == escenario]
+        conflictos = [m for m in rs if m[2] == CONFLICTO_ESPERADO.get(escenario)]
+        ok = [m for m in rs if 0 < m[2] < 400]
+        # la latencia incluye los 409 esperados: también son respuestas completas del endpoint
+        ms = [m[1] for m in ok + conflictos]
+        resumen.append({
+            "escenario": escenario,
+            "n": len(rs),
+            "ok": len(ok),
+            "conflictos": len(conflictos),
+            "errores": len(rs) - len(ok) - len(conflictos),
+            "rps": len(ms) / segundos,
+            "ms_p50": percentil(ms, 50) if ms else None,
+            "ms_p95": percentil(ms, 95) if ms else None,
+            "ms_p99": percentil(ms, 99) if ms else None,
+        })
+    return resumen
+
+
+def esperar_servidor(base: str, segundos: float = 30) -> None:
+    limite = time.monotonic() + segundos
+    while time.monotonic() < limite:
+        try:
+            if requests.get(f"{base}/salud", timeout=1).ok:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.3)
+    raise RuntimeError(f"El servidor no respondió en {base}/salud")
+
+
+def correr_modo(modo: str, escenarios: list[str], args) -> list[dict]:
+    env = {**os.environ, "DB_ASYNC": MODOS[modo]}
+    cmd = [
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--port", str(args.puerto), "--workers", str(args.workers), "--log-level", "warning",
+    ]
+    proc = subprocess.Popen(cmd, env=env)
+    base = f"http://127.0.0.1:{args.puerto}"
+    try:
+        esperar_servidor(base)
+        # calentamiento: conexiones del pool, imports perezosos, caches
+        medir(base, escenarios, argparse.Namespace(**{**vars(args), "duracion": args.calentamiento}))
+        return medir(base, escenarios, args)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+def fmt_ms(v: float | None) -> str:
+    return f"{v:.1f}" if v is not None else "-"
+
+
+def imprimir(modo: str, resumen: list[dict]) -> None:
+    for r in resumen:
+        print(
+            f"{modo:<8}{r['escenario']:<10}{r['n']:>8}{r['conflictos']:>8}{r['errores']:>8}{r['rps']:>10.1f}"
+            f"{fmt_ms(r['ms_p50']):>10}{fmt_ms(r['ms_p95']):>10}{fmt_ms(r['ms_p99']):>10}"
+        )
+
+
+def variacion(actual: float | None, base: float | None) -> float | None:
+    if actual is None or not base:
+        return None
+    return (actual - base) / base * 100
+
+
+def comparar(resultados: dict, baseline: dict, tolerancia: float) -> bool:
+    """Imprime la variación contra la baseline. Retorna True si algo empeoró más que la tolerancia."""
+    print(f"\nCOMPARACIÓN CONTRA BASELINE ({baseline.get('fecha', '?')}, commit {baseline.get('commit') or '?'})")
+    print(f"{'MODO':<8}{'ESC':<10}{'RPS':>10}{'Δ RPS':>9}{'P95 MS':>10}{'Δ P95':>9}  RESULTADO")
+    empeoro = False
+    for modo, resumen in resultados.items():
+        anteriores = {r["escenario"]: r for r in baseline.get("resultados", {}).get(modo, [])}
+        for r in resumen:
+            b = anteriores.get(r["escenario"])
+            if not b:
+                print(f"{modo:<8}{r['escenario']:<10}{r['rps']:>10.1f}{'':>9}{fmt_ms(r['ms_p95']):>10}{'':>9}  sin baseline")
+                continue
+            d_rps = variacion(r["rps"], b["rps"])
+            d_p95 = variacion(r["ms_p95"], b["ms_p95"])
+            peor = (d_rps is not None and d_rps < -tolerancia) or (d_p95 is not None and d_p95 > tolerancia)
+            empeoro |= peor
+            print(
+                f"{modo:<8}{r['escenario']:<10}{r['rps']:>10.1f}{d_rps if d_rps is not None else 0:>+8.1f}%"
+                f"{fmt_ms(r['ms_p95']):>10}{d_p95 if d_p95 is not None else 0:>+8.1f}%  {'PEOR' if peor else 'ok'}"
+            )
+    return empeoro
+
+
+def commit_actual() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=None, help="Servidor ya levantado (no se lanza uvicorn)")
+    parser.add_argument("--modos", default="sync,async", help="sync, async o ambos (ignora --url)")
+    parser.add_argument("--workers", type=int, default=1, help="Workers de uvicorn (igual para todos los modos)")
+    parser.add_argument("--puerto", type=int, default=8010)
+    parser.add_argument("--escenarios", default="ref,chofer,crear", help=f"Separados por coma: {', '.join(ESCENARIOS)}")
+    parser.add_argument("--concurrencia", type=int, default=32, help="Clientes simultáneos")
+    parser.add_argument("--duracion", type=float, default=20, help="Segundos de medición por modo")
+    parser.add_argument("--calentamiento", type=float, default=3)
+    parser.add_argument("--booking", default="BK1")
+    parser.add_argument("--dni", default="44556677")
+    parser.add_argument("--placas", default="ABC123/XYZ987")
+    parser.add_argument("--ruc", default="20123456789")
+    parser.add_argument("--choferes", type=int, default=0, help="Choferes sembrados (0 = usar --dni)")
+    parser.add_argument("--vehiculos", type=int, default=0, help="Vehículos sembrados (0 = usar --placas)")
+    parser.add_argument("--transportistas", type=int, default=0, help="Transportistas sembrados (0 = usar --ruc)")
+    parser.add_argument("--refs", type=int, default=0, help="Bookings sembrados (0 = usar --booking)")
+    parser.add_argument("--awb-contencion", type=int, default=8, help="Requests seguidos que piden el mismo AWB")
+    parser.add_argument("--lote-sync", type=int, default=200, help="Bookings por request de sync")
+    parser.add_argument("--sync-token", default=os.environ.get("SYNC_TOKEN"))
+    parser.add_argument("--archivo-ocr", type=Path, default=None, help="Imagen o PDF para el escenario ocr")
+    parser.add_argument("--tipo-ocr", default="AWB")
+    parser.add_argument("--json", type=Path, default=None, help="Guardar resultados en JSON")
+    parser.add_argument("--baseline", type=Path, default=None, help="JSON de una corrida anterior para comparar")
+    parser.add_argument("--tolerancia", type=float, default=10, help="%% de empeoramiento permitido contra la baseline")
+    args = parser.parse_args()
+
+    escenarios = [e.strip() for e in args.escenarios.split(",") if e.strip()]
+    if set(escenarios) - set(ESCENARIOS):
+        parser.error(f"Escenarios válidos: {', '.join(ESCENARIOS)}")
+    if "sync" in escenarios and not args.sync_token:
+        parser.error("El escenario sync necesita --sync-token (o SYNC_TOKEN)")
+    if "ocr" in escenarios and not args.archivo_ocr:
+        parser.error("El escenario ocr necesita --archivo-ocr")
+    # AWBs de esta corrida: no chocan con los de corridas anteriores
+    args.prefijo_awb = f"AWBC{uuid.uuid4().hex[:6].upper()}"
+
+    print(
+        f"{'MODO':<8}{'ESC':<10}{'N':>8}{'409':>8}{'ERR':>8}{'RPS':>10}"
+        f"{'P50 MS':>10}{'P95 MS':>10}{'P99 MS':>10}"
+    )
+    resultados = {}
+    if args.url:
+        resultados["url"] = medir(args.url.rstrip("/"), escenarios, args)
+        imprimir("url", resultados["url"])
+    else:
+        for modo in [m.strip() for m in args.modos.split(",") if m.strip()]:
+            if modo not in MODOS:
+                parser.error(f"Modo desconocido: {modo}")
+            resultados[modo] = correr_modo(modo, escenarios, args)
+            imprimir(modo, resultados[modo])
+
+    if args.json:
+        args.json.write_text(
+            json.dumps(
+                {
+                    "fecha": datetime.now().isoformat(timespec="seconds"),
+                    "commit": commit_actual(),
+                    "workers": args.workers,
+                    "concurrencia": args.concurrencia,
+                    "duracion": args.duracion,
+                    "resultados": resultados,
+                },
+                indent=2,
+            ),
+            encoding="utf-8",
+        )
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        if comparar(resultados, baseline, args.tolerancia):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+import math
+
+
+def percentil(valores: list[float], p: float) -> float:
+    # nearest-rank: con pocas muestras no inventa valores intermedios
+    orden = sorted(valores)
+    return orden[max(0, math.ceil(p / 100 * len(orden)) - 1)]
@@ -0,0 +1,163 @@
+"""
+Benchmark OCR sobre un corpus etiquetado: latencia (p50/p95), throughput, acierto
+y desglose por etapa, por TipoOCR y modo.
+- pipeline: el mismo camino que /ocr/extraer (decodificación/rasterizado,
+  preproceso, Tesseract, extracción), medido por etapa
+- crudo: solo escala de grises + Tesseract por defecto (lo que había antes)
+- preproceso: pipeline OpenCV del tipo + Tesseract por defecto
+- ajustado: pipeline OpenCV + config Tesseract del tipo (psm, whitelist, sin DAWG)
+
+Corpus = carpeta con imágenes/PDF + un corpus.csv:
+
+    archivo,tipo,esperado
+    dni_01.jpg,DNI,44556677
+    booking_03.pdf,BOOKING,EBKG01234567
+
+Uso (desde la raíz del repo):
+
+    python -m benchmarks.ocr_corpus ruta/al/corpus
+    python -m benchmarks.ocr_corpus ruta/al/corpus --modos crudo,ajustado,pipeline --repeticiones 3
+    python -m benchmarks.ocr_corpus ruta/al/corpus --json resultados.json
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import statistics
+import time
+from pathlib import Path
+
+import pytesseract
+
+from app.routers.ocr import (
+    ConfigTesseract,
+    config_tesseract,
+    extraer_valores,
+    imagen_desde_archivo,
+    procesar_ocr,
+)
+from app.utils.ocr_preproceso import PREPROCESO_POR_TIPO, preprocesar
+from app.utils.tiempos import Cronometro, cronometro_actual
+from benchmarks.comun import percentil
+
+MODOS = ("pipeline", "crudo", "preproceso", "ajustado")
+
+
+def cargar_corpus(carpeta: Path) -> list[dict]:
+    with open(carpeta / "corpus.csv", newline="", encoding="utf-8") as f:
+        filas = list(csv.DictReader(f))
+    for fila in filas:
+        fila["tipo"] = fila["tipo"].strip().upper()
+        fila["esperado"] = " ".join(fila["esperado"].split()).upper()
+    return filas
+
+
+def ocr_modo(ruta: Path, tipo: str, modo: str) -> tuple[list[str], float, dict[str, float]]:
+    """Corre un archivo en el modo dado. Retorna (valores, segundos, etapas_ms)."""
+    crono = Cronometro()
+    token = cronometro_actual.set(crono)
+    t0 = time.perf_counter()
+    try:
+        if modo == "pipeline":
+            valores = procesar_ocr(ruta, tipo, config_tesseract(tipo))["valores_detectados"]
+        else:
+            img = imagen_desde_archivo(ruta)
+            if modo == "crudo":
+                img = img.convert("L")
+            else:
+                img = preprocesar(img, PREPROCESO_POR_TIPO[tipo])
+            cfg = config_tesseract(tipo) if modo == "ajustado" else ConfigTesseract()
+            texto = pytesseract.image_to_string(img, lang=cfg.lang, config=cfg.como_config())
+            valores = extraer_valores(texto, tipo)
+    finally:
+        cronometro_actual.reset(token)
+    return valores, time.perf_counter() - t0, crono.etapas
+
+
+def correr(carpeta: Path, modos: list[str], repeticiones: int) -> list[dict]:
+    resultados = []
+    for fila in cargar_corpus(carpeta):
+        ruta = carpeta / fila["archivo"]
+        for modo in modos:
+            for _ in range(repeticiones):
+                valores, seg, etapas = ocr_modo(ruta, fila["tipo"], modo)
+                resultados.append({
+                    "archivo": fila["archivo"],
+                    "tipo": fila["tipo"],
+                    "modo": modo,
+                    "ms": seg * 1000,
+                    "etapas_ms": etapas,
+                    "detectado": fila["esperado"] in valores,
+                    "mejor": bool(valores) and valores[0] == fila["esperado"],
+                    "candidatos": len(set(valores)),
+                })
+    return resultados
+
+
+def resumir(resultados: list[dict]) -> list[dict]:
+    grupos: dict[tuple[str, str], list[dict]] = {}
+    for r in resultados:
+        grupos.setdefault((r["tipo"], r["modo"]), []).append(r)
+
+    resumen = []
+    for (tipo, modo), rs in sorted(grupos.items()):
+        ms = [r["ms"] for r in rs]
+        etapas: dict[str, list[float]] = {}
+        for r in rs:
+            for nombre, v in r["etapas_ms"].items():
+                etapas.setdefault(nombre, []).append(v)
+
+        resumen.append({
+            "tipo": tipo,
+            "modo": modo,
+            "n": len(rs),
+            "ms_p50": percentil(ms, 50),
+            "ms_p95": percentil(ms, 95),
+            "archivos_por_s": len(rs) / (sum(ms) / 1000) if sum(ms) else 0.0,
+            "acierto": sum(r["detectado"] for r in rs) / len(rs),
+            "acierto_mejor": sum(r["mejor"] for r in rs) / len(rs),
+            "candidatos_media": statistics.fmean(r["candidatos"] for r in rs),
+            # media por archivo (las etapas que no ocurren cuentan como 0)
+            "etapas_ms": {n: sum(v) / len(rs) for n, v in etapas.items()},
+        })
+    return resumen
+
+
+def imprimir(resumen: list[dict]) -> None:
+    print(
+        f"{'TIPO':<12}{'MODO':<12}{'N':>4}{'P50 MS':>9}{'P95 MS':>9}{'ARCH/S':>8}"
+        f"{'ACIERTO':>9}{'MEJOR':>8}{'CAND':>6}  ETAPAS (ms)"
+    )
+    for r in resumen:
+        etapas = " ".join(f"{n}={v:.0f}" for n, v in r["etapas_ms"].items())
+        print(
+            f"{r['tipo']:<12}{r['modo']:<12}{r['n']:>4}{r['ms_p50']:>9.1f}{r['ms_p95']:>9.1f}"
+            f"{r['archivos_por_s']:>8.2f}{r['acierto']:>9.0%}{r['acierto_mejor']:>8.0%}"
+            f"{r['candidatos_media']:>6.1f}  {etapas}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("corpus", type=Path, help="Carpeta con corpus.csv y los archivos")
+    parser.add_argument("--modos", default="pipeline", help=f"Separados por coma: {', '.join(MODOS)}")
+    parser.add_argument("--repeticiones", type=int, default=1, help="Corridas por archivo y modo")
+    parser.add_argument("--json", type=Path, default=None, help="Guardar detalle + resumen en JSON")
+    args = parser.parse_args()
+
+    modos = [m.strip() for m in args.modos.split(",") if m.strip()]
+    invalidos = set(modos) - set(MODOS)
+    if invalidos:
+        parser.error(f"Modos desconocidos: {', '.join(sorted(invalidos))}")
+
+    resultados = correr(args.corpus, modos, args.repeticiones)
+    resumen = resumir(resultados)
+    imprimir(resumen)
+
+    if args.json:
+        args.json.write_text(json.dumps({"resumen": resumen, "detalle": resultados}, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+"""
+Presupuesto de consultas SQL por endpoint (detector de N+1).
+
+Levanta la app contra una base descartable (SQLite temporal por defecto, o la URL
+que se pase), corre cada endpoint con una entrada chica (n=1) y una grande (n=N) y
+cuenta las sentencias SQL con un listener before_cursor_execute durante todo el
+request, cuerpo incluido (las exportaciones en streaming consultan recién al
+emitir el cuerpo, después de los headers). Falla si:
+- algún endpoint pasa su presupuesto, o
+- la cantidad de consultas crece con el tamaño de la entrada.
+
+Cada presupuesto es la suma de las sentencias que el endpoint necesita por diseño
+(ver `detalle`): si un cambio agrega una, hay que justificarla aquí.
+
+Uso (desde la raíz del repo):
+
+    python -m benchmarks.presupuesto_consultas
+    python -m benchmarks.presupuesto_consultas --database-url postgresql://.../logicapture_ci --n 25
+    python -m benchmarks.presupuesto_consultas --db-async   # endpoints calientes con sesión async
+
+OJO: con --database-url se crean y borran todas las tablas: usar una base vacía.
+Sale con código 1 si hay violaciones (sirve como paso de CI).
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import os
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import date
+from typing import Callable
+
+_secuencia = itertools.count(1)
+
+
+def unico(prefijo: str) -> str:
+    return f"{prefijo}{next(_secuencia):06d}"
+
+
+@dataclass
+class Caso:
+    nombre: str
+    presupuesto: int  # máximo de sentencias SQL por request
+    llamar: Callable  # (cliente, n) -> Response; se mide el último request que hace
+    detalle: str  # de qué sentencias sale el presupuesto
+    escala: bool = True  # False = la entrada no depende de n (solo se mide una vez)
+
+
+# ---------- preparación de datos ----------
+
+def payload_chofer() -> dict:
+    return {"dni": unico("9")[:8], "primer_nombre": "Ana", "apellido_paterno": "Rojas", "apellido_materno": "Vega"}
+
+
+def payload_vehiculo() -> dict:
+    tracto = unico("A")
+    return {
+        "placa_tracto": tracto, "placas": f"{tracto}/{unico('C')}",
+        "largo_tracto": 6.8, "ancho_tracto": 2.5, "alto_tracto": 3.2,
+        "largo_carreta": 12, "ancho_carreta": 2.5, "alto_carreta": 3.2,
+        "configuracion_vehicular": "T3/S3", "peso_neto_carreta": 8000, "peso_neto_tracto": 9000, "marca": "VOLVO",
+    }
+
+
+def payload_transportista() -> dict:
+    return {"codigo_sap": unico("SAP"), "ruc": unico("20"), "nombre_transportista": unico("TRANSPORTES ")}
+
+
+def crear(c, ruta: str, payload: dict) -> dict:
+    c.post(f"/api/v1/{ruta}", json=payload)
+    return payload
+
+
+_base: dict = {}
+
+
+def base(c) -> dict:
+    """Chofer, vehículo y transportista compartidos por los registros de prueba."""
+    if not _base:
+        _base["dni"] = crear(c, "choferes", payload_chofer())["dni"]
+        _base["placas"] = crear(c, "vehiculos", payload_vehiculo())["placas"]
+        _base["ruc"] = crear(c, "transportistas", payload_transportista())["ruc"]
+    return _base
+
+
+def payload_registro(c, n_termografos: int = 1, **extra) -> dict:
+    b = base(c)
+    return {
+        "booking": unico("BK"), "awb": unico("AWB"), "dni": b["dni"], "placas": b["placas"], "ruc": b["ruc"],
+        "termografos": "/".join(unico("T") for _ in range(n_termografos)),
+        "ps_beta": unico("PS"), "ps_aduana": unico("AD"), "ps_operador": unico("OP"),
+        "senasa": "S1", "ps_linea": unico("LIN"),
+        **extra,
+    }
+
+
+def registros(c, n: int) -> list[int]:
+    return [c.post("/api/v1/registros", json=payload_registro(c)).json()["id"] for _ in range(n)]
+
+
+def registro_duplicado(c, n: int):
+    # El 1er registro con BK409 se crea una sola vez; el POST medido choca por BOOKING
+    if "bk409" not in _base:
+        c.post("/api/v1/registros", json=payload_registro(c, booking="BK409"))
+        _base["bk409"] = True
+    return c.post("/api/v1/registros", json=payload_registro(c, n_termografos=n, booking="BK409"))
+
+
+def listar(c, ruta: str, payload, n: int):
+    for _ in range(n):
+        crear(c, ruta, payload())
+    return c.get(f"/api/v1/{ruta}", params={"limit": n})
+
+
+def sync(c, ruta: str, items: list[dict]):
+    return c.post(f"/api/v1/sync/{ruta}", json=items, headers={"x-sync-token": os.environ["SYNC_TOKEN"]})
+
+
+def sync_mixto(c, ruta: str, nuevos: list[dict], existente: dict):
+    # `existente` se guarda antes de medir: así n=1 y n=N tienen inserts + updates
+    clave = f"sync_{ruta}"
+    if clave not in _base:
+        sync(c, ruta, [existente])
+        _base[clave] = True
+    return sync(c, ruta, nuevos + [existente])
+
+
+# ---------- casos (presupuesto = sentencias por request) ----------
+
+HOY = date.today().isoformat()
+
+# Piezas que se repiten en los detalles
+ALTA_CATALOGO = "SELECT duplicado + INSERT + SELECT de refresh"
+BUSQUEDAS_REGISTRO = "5 SELECT (chofer, vehículo, transportista, ref_posicionamiento, ref_booking_dam) + 1 SELECT de unicidad (todos los valores juntos)"
+PROYECCION_SAP = "refrescar_proyeccion_sap: SELECT con joins + DELETE + INSERT"
+SYNC = "SELECT de ids existentes (uno cada 1000 bookings) + INSERT executemany + UPDATE executemany"
+
+CASOS = [
+    Caso("POST /choferes", 3, lambda c, n: c.post("/api/v1/choferes", json=payload_chofer()), ALTA_CATALOGO, escala=False),
+    Caso("GET /choferes", 1, lambda c, n: listar(c, "choferes", payload_chofer, n), "1 SELECT paginado"),
+    Caso("GET /choferes/buscar", 1, lambda c, n: c.get("/api/v1/choferes/buscar", params={"dni": base(c)["dni"]}),
+         "1 SELECT por dni", escala=False),
+    Caso("POST /vehiculos", 3, lambda c, n: c.post("/api/v1/vehiculos", json=payload_vehiculo()), ALTA_CATALOGO, escala=False),
+    Caso("GET /vehiculos", 1, lambda c, n: listar(c, "vehiculos", payload_vehiculo, n), "1 SELECT paginado"),
+    Caso("GET /vehiculos/buscar", 1, lambda c, n: c.get("/api/v1/vehiculos/buscar", params={"placas": base(c)["placas"]}),
+         "1 SELECT por placas", escala=False),
+    Caso("POST /transportistas", 3, lambda c, n: c.post("/api/v1/transportistas", json=payload_transportista()),
+         ALTA_CATALOGO, escala=False),
+    Caso("GET /transportistas", 1, lambda c, n: listar(c, "transportistas", payload_transportista, n), "1 SELECT paginado"),
+    Caso("GET /transportistas/buscar", 1, lambda c, n: c.get("/api/v1/transportistas/buscar", params={"texto": "TRANSPORTES", "limit": n}),
+         "1 SELECT (ruc / código SAP / nombre)"),
+    Caso("POST /sync/posicionamiento", 3, lambda c, n: sync_mixto(c, "posicionamiento", [
+        {"booking": unico("BKS"), "o_beta": unico("OB"), "awb": unico("AW")} for _ in range(n)
+    ], {"booking": "BKREF", "o_beta": unico("OB")}), SYNC),
+    Caso("POST /sync/dams", 3, lambda c, n: sync_mixto(c, "dams", [
+        {"booking": unico("BKD"), "dam": unico("DAM")} for _ in range(n)
+    ], {"booking": "BKREF", "dam": unico("DAM")}), SYNC),
+    Caso("GET /ref/booking", 2, lambda c, n: c.get("/api/v1/ref/booking/BKREF"),
+         "SELECT ref_posicionamiento + SELECT ref_booking_dam", escala=False),
+    Caso("POST /registros", 12, lambda c, n: c.post("/api/v1/registros", json=payload_registro(c, n_termografos=n)),
+         f"{BUSQUEDAS_REGISTRO} + INSERT registro + {PROYECCION_SAP} + INSERT his_unicos (uno para todos) + SELECT de refresh"),
+    Caso("POST /registros (409)", 6, registro_duplicado, f"{BUSQUEDAS_REGISTRO}; el 409 sale antes de escribir"),
+    Caso("GET /registros", 1, lambda c, n: registros(c, n) and c.get("/api/v1/registros", params={"limit": n}),
+         "1 SELECT con joins (sin N+1 por chofer/vehículo/transportista)"),
+    Caso("GET /registros/buscar", 1, lambda c, n: registros(c, n) and c.get(
+        "/api/v1/registros/buscar", params={"valor": "AWB", "prefijo": True, "limit": n}
+    ), "1 SELECT sobre his_unicos"),
+    Caso("POST /registros/{id}/cerrar", 6, lambda c, n: c.post(f"/api/v1/registros/{registros(c, 1)[0]}/cerrar"),
+         f"SELECT registro + UPDATE his_unicos (libera AWB) + UPDATE registro + {PROYECCION_SAP}", escala=False),
+    Caso("POST /registros/cerrar-lote", 4, lambda c, n: c.post(
+        "/api/v1/registros/cerrar-lote", json={"ids": registros(c, n) + [10**9]}
+    ), "UPDATE registros + UPDATE his_unicos + UPDATE proyección (cada uno para todo el lote) + SELECT de los ids no cerrados"),
+    Caso("GET /registros/{id}/sap", 1, lambda c, n: c.get(f"/api/v1/registros/{registros(c, 1)[0]}/sap"),
+         "1 SELECT a la proyección", escala=False),
+    Caso("GET /registros/sap/exportar", 1, lambda c, n: c.get("/api/v1/registros/sap/exportar", params={"ids": registros(c, n)}),
+         "1 SELECT a la proyección, leído con cursor del servidor mientras sale el CSV"),
+    Caso("GET /registros/sap/exportar (xlsx)", 1, lambda c, n: c.get(
+        "/api/v1/registros/sap/exportar", params={"ids": registros(c, n), "formato": "xlsx"}
+    ), "1 SELECT a la proyección"),
+    Caso("GET /registros/sap/stream", 1, lambda c, n: registros(c, n) and c.get(
+        "/api/v1/registros/sap/stream", params={"desde": HOY, "hasta": HOY}
+    ), "1 SELECT a la proyección, leído con cursor del servidor mientras sale el cuerpo"),
+]
+
+
+_sentencias = {"n": 0}
+
+
+def contar_sentencia(conn, cursor, statement, parameters, context, executemany):
+    _sentencias["n"] += 1
+
+
+def correr(cliente, n_grande: int) -> list[dict]:
+    filas = []
+    for caso in CASOS:
+        tamanos = (1, n_grande) if caso.escala else (1,)
+        conteos = []
+        for n in tamanos:
+            r = caso.llamar(cliente, n)
+            if r.status_code >= 500:
+                raise RuntimeError(f"{caso.nombre}: respuesta inesperada {r.status_code} {r.text[:200]}")
+            conteos.append(cliente.sentencias)
+
+        problemas = []
+        if max(conteos) > caso.presupuesto:
+            problemas.append(f"presupuesto {caso.presupuesto}")
+        if len(conteos) == 2 and conteos[1] > conteos[0]:
+            problemas.append(f"crece con n ({conteos[0]} -> {conteos[1]})")
+        filas.append({
+            "caso": caso.nombre, "conteos": conteos, "presupuesto": caso.presupuesto,
+            "detalle": caso.detalle, "problemas": problemas,
+        })
+    return filas
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None, help="Base descartable (por defecto SQLite temporal)")
+    parser.add_argument("--n", type=int, default=10, help="Tamaño de la entrada grande")
+    parser.add_argument("--db-async", action="store_true", help="Correr con DB_ASYNC=true (aiosqlite / psycopg v3)")
+    args = parser.parse_args()
+
+    tmp = None
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        tmp = tempfile.NamedTemporaryFile(prefix="presupuesto_", suffix=".db", delete=False)
+        tmp.close()
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp.name}"
+    os.environ["DB_ASYNC"] = "true" if args.db_async else "false"
+    os.environ.setdefault("SYNC_TOKEN", "presupuesto")
+
+    # Importar la app recién ahora: settings se lee al importar
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    import app.models  # noqa: F401
+    from app.database import Base, engine
+    from app.main import app
+    from app.models import catalogos, operacion, proyeccion_sap, ref_booking_dam, ref_posicionamiento, unicos  # noqa: F401
+
+    class ClienteMedido(TestClient):
+        """Cuenta las sentencias de cada request; TestClient retorna con el cuerpo ya consumido."""
+        sentencias = 0
+
+        def request(self, *args, **kwargs):
+            antes = _sentencias["n"]
+            respuesta = super().request(*args, **kwargs)
+            self.sentencias = _sentencias["n"] - antes
+            return respuesta
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    try:
+        with ClienteMedido(app) as cliente:
+            # El calentamiento corre consultas en segundo plano: esperar a que termine
+            while cliente.get("/listo").json()["estado"] in ("pendiente", "calentando"):
+                time.sleep(0.05)
+            event.listen(Engine, "before_cursor_execute", contar_sentencia)
+            try:
+                filas = correr(cliente, args.n)
+            finally:
+                event.remove(Engine, "before_cursor_execute", contar_sentencia)
+    finally:
+        Base.metadata.drop_all(engine)
+        engine.dispose()
+        if tmp:
+            os.unlink(tmp.name)
+
+    print(f"{'ENDPOINT':<36}{'N=1':>6}{f'N={args.n}':>7}{'MAX':>6}  RESULTADO")
+    for f in filas:
+        grande = str(f["conteos"][1]) if len(f["conteos"]) == 2 else "-"
+        estado = "FALLA: " + ", ".join(f["problemas"]) if f["problemas"] else "ok"
+        print(f"{f['caso']:<36}{f['conteos'][0]:>6}{grande:>7}{f['presupuesto']:>6}  {estado}")
+        if f["problemas"]:
+            print(f"{'':<36}presupuesto = {f['detalle']}")
+
+    if any(f["problemas"] for f in filas):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+Siembra una base Postgres local con volúmenes realistas para las pruebas de carga:
+- miles de choferes, vehículos y transportistas
+- ~100k bookings en ref_posicionamiento / ref_booking_dam
+- registros históricos con sus candados: ~7 filas de his_unicos por registro
+  (150k registros ≈ 1M his_unicos), 80% cerrados (AWB liberado)
+- la proyección SAP de esos registros
+
+Todo se genera con generate_series en el servidor (no viaja fila por fila) y con
+valores deterministas (ver dni(), placas(), ruc(), booking_ref()) para que
+benchmarks.carga pueda elegir al azar filas que existen. Los catálogos y refs usan
+ON CONFLICT DO NOTHING y los registros se saltan si ya están: se puede re-correr.
+
+Uso (desde la raíz del repo, con DATABASE_URL apuntando a la base de pruebas y
+`alembic upgrade head` ya corrido):
+
+    python -m benchmarks.sembrar
+    python -m benchmarks.sembrar --registros 300000 --refs 200000
+
+Con --verificar corre los mismos INSERT con pocas filas en una transacción que se
+deshace, sobre la base ya migrada: sale con código 1 si la base no está en head o si
+alguna sentencia falla o no siembra nada (sirve como paso de CI tras cambiar migraciones).
+
+    python -m benchmarks.sembrar --verificar
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+from sqlalchemy import text
+
+# ---------- valores sembrados (los usa también benchmarks.carga) ----------
+
+DNI_BASE = 60_000_000
+RUC_BASE = 20_600_000_000
+
+
+def dni(i: int) -> str:
+    return str(DNI_BASE + i)
+
+
+def placas(i: int) -> str:
+    return f"B{i:05d}/C{i:05d}"
+
+
+def ruc(i: int) -> str:
+    return str(RUC_BASE + i)
+
+
+def booking_ref(i: int) -> str:
+    return f"BKR{i:07d}"
+
+
+# ---------- SQL (los mismos formatos que arriba, del lado del servidor) ----------
+
+SQL_CHOFERES = f"""
+INSERT INTO cat_choferes (dni, primer_nombre, apellido_paterno, apellido_materno, licencia, estado)
+SELECT ({DNI_BASE} + i)::text, 'CHOFER', 'BENCH', 'PRUEBA', 'Q' || ({DNI_BASE} + i), 'activo'
+FROM generate_series(1, :n) AS i
+ON CONFLICT (dni) DO NOTHING
+"""
+
+SQL_VEHICULOS = """
+INSERT INTO cat_vehiculos (
+    placa_tracto, placa_carreta, placas, marca, cert_vehicular,
+    largo_tracto, ancho_tracto, alto_tracto, largo_carreta, ancho_carreta, alto_carreta,
+    configuracion_vehicular, peso_neto_carreta, peso_neto_tracto, peso_bruto_vehicular, estado
+)
+SELECT
+    'B' || lpad(i::text, 5, '0'), 'C' || lpad(i::text, 5, '0'),
+    'B' || lpad(i::text, 5, '0') || '/C' || lpad(i::text, 5, '0'),
+    (ARRAY['VOLVO', 'SCANIA', 'FREIGHTLINER'])[1 + i % 3], 'CV' || i,
+    6.8, 2.5, 3.2, 12.0, 2.5, 3.2,
+    'T3/S3', 8000, 9000, 48000, 'activo'
+FROM generate_series(1, :n) AS i
+ON CONFLICT (placas) DO NOTHING
+"""
+
+SQL_TRANSPORTISTAS = f"""
+INSERT INTO cat_transportistas (codigo_sap, ruc, nombre_transportista, partida_registral, estado)
+SELECT 'SAPB' || lpad(i::text, 5, '0'), ({RUC_BASE} + i)::text, 'TRANSPORTES BENCH ' || i, 'PR' || i, 'activo'
+FROM generate_series(1, :n) AS i
+ON CONFLICT DO NOTHING
+"""
+
+SQL_REF_POSICIONAMIENTO = """
+INSERT INTO ref_posicionamiento (booking, o_beta, awb)
+SELECT 'BKR' || lpad(i::text, 7, '0'), 'OBR' || lpad(i::text, 7, '0'), 'BNCU' || lpad(i::text, 7, '0')
+FROM generate_series(1, :n) AS i
+ON CONFLICT (booking) DO NOTHING
+"""
+
+SQL_REF_BOOKING_DAM = """
+INSERT INTO ref_booking_dam (booking, dam)
+SELECT 'BKR' || lpad(i::text, 7, '0'), '118-2025-40-' || lpad(i::text, 6, '0')
+FROM generate_series(1, :n) AS i
+ON CONFLICT (booking) DO NOTHING
+"""
+
+# Registros repartidos en el último año; los catálogos se toman de los sembrados
+SQL_REGISTROS = f"""
+WITH ch AS (SELECT array_agg(id ORDER BY id) AS ids FROM cat_choferes WHERE length(dni) = 8 AND dni BETWEEN '{DNI_BASE + 1}' AND ({DNI_BASE} + :choferes)::text),
+     ve AS (SELECT array_agg(id ORDER BY id) AS ids FROM cat_vehiculos WHERE placas LIKE 'B_____/C_____'),
+     tr AS (SELECT array_agg(id ORDER BY id) AS ids FROM cat_transportistas WHERE codigo_sap LIKE 'SAPB%')
+INSERT INTO ope_registros (
+    fecha_registro, o_beta, booking, awb, chofer_id, vehiculo_id, transportista_id,
+    termografos, ps_beta, ps_aduana, ps_operador, estado
+)
+SELECT
+    now() - (i % 365) * interval '1 day' - (i % 86400) * interval '1 second',
+    'OBB' || lpad(i::text, 7, '0'),
+    'BKB' || lpad(i::text, 7, '0'),
+    'BNCB' || lpad(i::text, 7, '0'),
+    ch.ids[1 + i % cardinality(ch.ids)],
+    ve.ids[1 + i % cardinality(ve.ids)],
+    tr.ids[1 + i % cardinality(tr.ids)],
+    'TA' || lpad(i::text, 7, '0') || '/TB' || lpad(i::text, 7, '0'),
+    'PSB' || lpad(i::text, 7, '0'),
+    'ADB' || lpad(i::text, 7, '0'),
+    'OPB' || lpad(i::text, 7, '0'),
+    CASE WHEN i % 5 = 0 THEN 'borrador' ELSE 'cerrado' END
+FROM generate_series(1, :n) AS i, ch, ve, tr
+"""
+
+# Los mismos candados que pone crear_registro (AWB vigente solo si sigue en borrador).
+# Sin destino en el ON CONFLICT: desde 8379a6396418 la unicidad son los índices parciales
+# ux_his_unicos_historicos_tipo_valor y ux_his_unicos_awb_vigente (ya no hay constraint)
+SQL_UNICOS = """
+INSERT INTO his_unicos (tipo, valor, fecha_uso, referencia, registro_id, usuario, origen, vigente, liberado_en)
+SELECT u.tipo, u.valor, r.fecha_registro, 'REG-' || r.id, r.id, 'bench', 'registro',
+       u.tipo = 'AWB' AND r.estado = 'borrador',
+       CASE WHEN u.tipo = 'AWB' AND r.estado = 'cerrado' THEN r.fecha_registro END
+FROM ope_registros r
+CROSS JOIN LATERAL (VALUES
+    ('O_BETA', r.o_beta),
+    ('BOOKING', r.booking),
+    ('AWB', r.awb),
+    ('TERMOGRAFO', split_part(r.termografos, '/', 1)),
+    ('TERMOGRAFO', split_part(r.termografos, '/', 2)),
+    ('PS_BETA', r.ps_beta),
+    ('PS_ADUANA', r.ps_aduana)
+) AS u(tipo, valor)
+WHERE r.booking LIKE 'BKB%'
+ON CONFLICT DO NOTHING
+"""
+
+
+def paso(conn, nombre: str, sql: str, **params) -> int:
+    t0 = time.perf_counter()
+    filas = conn.execute(text(sql), params).rowcount
+    print(f"{nombre:<22}{filas:>10} filas  {time.perf_counter() - t0:>7.1f} s")
+    return filas
+
+
+def verificar(engine) -> list[str]:
+    """Corre la siembra chica contra el esquema migrado y la deshace. Retorna los errores."""
+    from alembic.config import Config
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+
+    heads = set(ScriptDirectory.from_config(Config("alembic.ini")).get_heads())
+    errores = []
+    with engine.connect() as conn:
+        actuales = set(MigrationContext.configure(conn).get_current_heads())
+        if actuales != heads:
+            return [f"La base está en {sorted(actuales) or 'ninguna revisión'}, no en head {sorted(heads)}: correr `alembic upgrade head`"]
+
+        tx = conn.begin()
+        try:
+            pasos = [
+                ("cat_choferes", SQL_CHOFERES, {"n": 3}),
+                ("cat_vehiculos", SQL_VEHICULOS, {"n": 3}),
+                ("cat_transportistas", SQL_TRANSPORTISTAS, {"n": 3}),
+                ("ref_posicionamiento", SQL_REF_POSICIONAMIENTO, {"n": 3}),
+                ("ref_booking_dam", SQL_REF_BOOKING_DAM, {"n": 3}),
+                ("ope_registros", SQL_REGISTROS, {"n": 5, "choferes": 3}),
+                ("his_unicos", SQL_UNICOS, {}),
+            ]
+            filas = {}
+            for nombre, sql, params in pasos:
+                try:
+                    with conn.begin_nested():
+                        filas[nombre] = paso(conn, nombre, sql, **params)
+                except Exception as e:
+                    errores.append(f"{nombre}: {type(e).__name__}: {e}")
+            if filas.get("his_unicos") == 0:
+                errores.append("his_unicos: no se sembró ninguna fila")
+        finally:
+            tx.rollback()
+    return errores
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--choferes", type=int, default=5000)
+    parser.add_argument("--vehiculos", type=int, default=5000)
+    parser.add_argument("--transportistas", type=int, default=1000)
+    parser.add_argument("--refs", type=int, default=100_000, help="Bookings en ref_posicionamiento y ref_booking_dam")
+    parser.add_argument("--registros", type=int, default=150_000, help="~7 filas de his_unicos por registro")
+    parser.add_argument("--verificar", action="store_true", help="Probar la siembra contra el esquema migrado y deshacerla")
+    args = parser.parse_args()
+
+    # Importar recién aquí: settings lee DATABASE_URL al importar
+    from app.database import SessionLocal, engine
+    from app.models.operacion import RegistroOperativo
+    from app.utils.proyeccion_sap import refrescar_proyeccion_sap
+
+    if engine.dialect.name != "postgresql":
+        parser.error(f"La siembra usa SQL de Postgres (DATABASE_URL es {engine.dialect.name})")
+
+    if args.verificar:
+        errores = verificar(engine)
+        for error in errores:
+            print(f"ERROR {error}")
+        print("Siembra verificada (deshecha)" if not errores else f"{len(errores)} paso(s) fallaron")
+        raise SystemExit(1 if errores else 0)
+
+    with engine.begin() as conn:
+        paso(conn, "cat_choferes", SQL_CHOFERES, n=args.choferes)
+        paso(conn, "cat_vehiculos", SQL_VEHICULOS, n=args.vehiculos)
+        paso(conn, "cat_transportistas", SQL_TRANSPORTISTAS, n=args.transportistas)
+        paso(conn, "ref_posicionamiento", SQL_REF_POSICIONAMIENTO, n=args.refs)
+        paso(conn, "ref_booking_dam", SQL_REF_BOOKING_DAM, n=args.refs)
+
+        ya_sembrados = conn.execute(text("SELECT count(*) FROM ope_registros WHERE booking LIKE 'BKB%'")).scalar_one()
+        if ya_sembrados:
+            print(f"ope_registros: ya hay {ya_sembrados} registros sembrados, se saltan registros y his_unicos")
+        else:
+            paso(conn, "ope_registros", SQL_REGISTROS, n=args.registros, choferes=args.choferes)
+            paso(conn, "his_unicos", SQL_UNICOS)
+
+    if not ya_sembrados:
+        t0 = time.perf_counter()
+        with SessionLocal() as db:
+            filas = refrescar_proyeccion_sap(db, RegistroOperativo.booking.like("BKB%"), lote=5000)
+            db.commit()
+        print(f"{'ope_proyeccion_sap':<22}{filas:>10} filas  {time.perf_counter() - t0:>7.1f} s")
+
+    with engine.begin() as conn:
+        t0 = time.perf_counter()
+        conn.execute(text("ANALYZE"))
+        print(f"{'ANALYZE':<22}{'':>16}{time.perf_counter() - t0:>7.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,12 @@
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pandas as pd
 from io import BytesIO
 from urllib.parse import quote
 
-from PIL import ImageGrab, Image  # pillow
+from PIL import ImageGrab, Image, ImageOps  # pillow
 
 API_URL = "https://logicapture-beta.onrender.com/api/v1"
 
@@ -35,6 +37,7 @@ def init_state():
     st.session_state.setdefault("registro_id", None)
     st.session_state.setdefault("sap_rows", [])          # lista de dicts (incluye REGISTRO_ID)
     st.session_state.setdefault("registro_estado", {})   # {id: "borrador"/"cerrado"}
+    st.session_state.setdefault("ultima_escritura", None)  # X-Escritura de la última escritura de este usuario
 
     # OCR state
     st.session_state.setdefault("ocr_tipo", None)
@@ -46,6 +49,54 @@ def init_state():
 init_state()
 
 
+# -------------------------
+# HTTP: una sola sesión keep-alive para todos los reruns
+# -------------------------
+@st.cache_resource
+def http() -> requests.Session:
+    """
+    Sesión compartida entre reruns (st.cache_resource): reutiliza la conexión TLS a Render.
+    - Reintenta errores de conexión siempre (el request no llegó a salir)
+    - Reintenta 502/503/504 solo en GET (Render despertando); los POST no se repiten
+    """
+    s = requests.Session()
+    reintentos = Retry(
+        total=3,
+        connect=3,
+        read=1,
+        backoff_factor=0.5,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        raise_on_status=False,
+    )
+    adaptador = HTTPAdapter(pool_connections=2, pool_maxsize=10, max_retries=reintentos)
+    s.mount("https://", adaptador)
+    s.mount("http://", adaptador)
+    return s
+
+
+# -------------------------
+# Read-your-writes con réplica de lectura (por usuario, no en la sesión HTTP compartida)
+# -------------------------
+def anotar_escritura(resp: requests.Response) -> None:
+    """El backend responde X-Escritura cuando el request escribió en la base."""
+    if resp.headers.get("X-Escritura"):
+        st.session_state["ultima_escritura"] = resp.headers["X-Escritura"]
+
+
+def headers_lectura() -> dict:
+    """Lecturas que deben ver lo que este usuario acaba de escribir (el backend decide la ventana)."""
+    ultima = st.session_state.get("ultima_escritura")
+    return {"X-Leer-Primario": ultima} if ultima else {}
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def obtener_refs_booking(booking: str) -> tuple[int, dict | None]:
+    """Refs por BOOKING con caché corta: cada rerun no vuelve a pegarle al backend."""
+    resp = http().get(f"{API_URL}/ref/booking/{quote(booking)}", timeout=15)
+    return resp.status_code, (resp.json() if resp.status_code == 200 else None)
+
+
 # -------------------------
 # Helpers
 # -------------------------
@@ -98,18 +149,17 @@ def autocompletar_por_booking():
         return
 
     try:
-        resp = requests.get(f"{API_URL}/ref/booking/{quote(b)}", timeout=15)
+        status, data = obtener_refs_booking(b)
 
-        if resp.status_code != 200:
+        if status != 200:
             st.session_state["ref_found"] = False
             st.session_state["dam_ref"] = ""
             st.session_state["o_beta_ref"] = ""
             st.session_state["awb_ref"] = ""
             st.session_state["last_autofill_ok"] = False
-            st.warning(f"No encontré referencias para ese BOOKING (HTTP {resp.status_code}).")
+            st.warning(f"No encontré referencias para ese BOOKING (HTTP {status}).")
             return
 
-        data = resp.json()
         st.session_state["ref_found"] = True
 
         o_beta = (data.get("o_beta") or "").strip()
@@ -161,9 +211,56 @@ def agregar_termografo():
     st.rerun()
 
 
+# Si el backend no responde /ocr/config usamos lo mismo que publica por defecto
+CONFIG_OCR_DEFECTO = {
+    "max_lado_px": 2400,
+    "max_lado_por_tipo": {},
+    "escala_grises": True,
+    "formato_captura": "PNG",
+    "formato_foto": "JPEG",
+    "calidad_jpeg": 85,
+}
+
+
+@st.cache_data(ttl=600, show_spinner=False)
+def obtener_config_ocr() -> dict:
+    try:
+        r = http().get(f"{API_URL}/ocr/config", timeout=10)
+        if r.status_code == 200:
+            return {**CONFIG_OCR_DEFECTO, **r.json()}
+    except requests.RequestException:
+        pass
+    return CONFIG_OCR_DEFECTO
+
+
+def comprimir_para_ocr(img: Image.Image, tipo: str, es_captura: bool) -> tuple[bytes, str, str]:
+    """
+    Reduce la imagen a lo que el OCR realmente usa (según /ocr/config) antes de subirla.
+    Retorna (contenido, filename, mime).
+    """
+    cfg = obtener_config_ocr()
+    max_lado = cfg["max_lado_por_tipo"].get(tipo) or cfg["max_lado_px"]
+
+    if max_lado and max(img.size) > max_lado:
+        img.thumbnail((max_lado, max_lado), Image.Resampling.LANCZOS)
+    img = ImageOps.exif_transpose(img)  # fotos de celular giradas
+    if cfg["escala_grises"]:
+        img = img.convert("L")
+    elif img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+
+    buf = BytesIO()
+    if es_captura and cfg["formato_captura"] == "PNG":
+        img.save(buf, format="PNG", optimize=True)
+        return buf.getvalue(), "ocr.png", "image/png"
+
+    img.save(buf, format="JPEG", quality=cfg["calidad_jpeg"], optimize=True)
+    return buf.getvalue(), "ocr.jpg", "image/jpeg"
+
+
 def ocr_enviar_bytes(tipo: str, contenido: bytes, filename: str, mime: str):
     files = {"archivo": (filename, contenido, mime)}
-    return requests.post(
+    return http().post(
         f"{API_URL}/ocr/extraer",
         params={"tipo": tipo},
         files=files,
@@ -177,10 +274,8 @@ def ocr_desde_clipboard(tipo: str):
         st.warning("No se detectó imagen en el portapapeles. Usa Win+Shift+S y vuelve a intentar.")
         return None
 
-    buf = BytesIO()
-    clip.save(buf, format="PNG")
-    contenido = buf.getvalue()
-    return ocr_enviar_bytes(tipo, contenido, "clipboard.png", "image/png")
+    contenido, filename, mime = comprimir_para_ocr(clip, tipo, es_captura=True)
+    return ocr_enviar_bytes(tipo, contenido, filename, mime)
 
 
 def guardar_resultado_ocr(tipo: str, data: dict):
@@ -192,7 +287,7 @@ def guardar_resultado_ocr(tipo: str, data: dict):
 
 def fetch_y_apilar_sap(registro_id: int):
     try:
-        r = requests.get(f"{API_URL}/registros/{registro_id}/sap", timeout=15)
+        r = http().get(f"{API_URL}/registros/{registro_id}/sap", headers=headers_lectura(), timeout=15)
         if r.status_code != 200:
             st.error(f"No se pudo obtener SAP-ready: {r.status_code} - {r.text}")
             return
@@ -206,7 +301,8 @@ def fetch_y_apilar_sap(registro_id: int):
 
 def cerrar_registro_backend(registro_id: int):
     try:
-        r = requests.post(f"{API_URL}/registros/{registro_id}/cerrar", timeout=15)
+        r = http().post(f"{API_URL}/registros/{registro_id}/cerrar", timeout=15)
+        anotar_escritura(r)
         if r.status_code != 200:
             st.error(f"No se pudo cerrar: {r.status_code} - {r.text}")
             return
@@ -216,6 +312,25 @@ def cerrar_registro_backend(registro_id: int):
         st.error(f"Error cerrando registro: {e}")
 
 
+def cerrar_lote_backend(registro_ids: list[int]):
+    try:
+        r = http().post(f"{API_URL}/registros/cerrar-lote", json={"ids": registro_ids}, timeout=30)
+        anotar_escritura(r)
+        if r.status_code != 200:
+            st.error(f"No se pudo cerrar el lote: {r.status_code} - {r.text}")
+            return
+        data = r.json()
+        for res in data["resultados"]:
+            if res["estado"] in ("cerrado", "ya estaba cerrado"):
+                st.session_state.registro_estado[str(res["id"])] = "cerrado"
+        no_encontrados = [str(res["id"]) for res in data["resultados"] if res["estado"] == "no encontrado"]
+        st.success(f"{data['cerrados']} registro(s) cerrados. AWB liberados.")
+        if no_encontrados:
+            st.warning(f"No encontrados: {', '.join(no_encontrados)}")
+    except Exception as e:
+        st.error(f"Error cerrando lote: {e}")
+
+
 # -------------------------
 # Semáforo (completitud)
 # -------------------------
@@ -396,13 +511,12 @@ with tab_captura:
             st.warning("Sube una imagen o PDF primero.")
         else:
             try:
-                files = {"archivo": (archivo.name, archivo.getvalue(), archivo.type)}
-                resp = requests.post(
-                    f"{API_URL}/ocr/extraer",
-                    params={"tipo": tipo_ocr},
-                    files=files,
-                    timeout=90
-                )
+                if archivo.type == "application/pdf":
+                    contenido, filename, mime = archivo.getvalue(), archivo.name, archivo.type
+                else:
+                    img = Image.open(BytesIO(archivo.getvalue()))
+                    contenido, filename, mime = comprimir_para_ocr(img, tipo_ocr, es_captura=archivo.type == "image/png")
+                resp = ocr_enviar_bytes(tipo_ocr, contenido, filename, mime)
                 if resp.status_code != 200:
                     st.error(f"OCR falló: {resp.status_code} - {resp.text}")
                 else:
@@ -510,7 +624,8 @@ with tab_captura:
         }
 
         try:
-            resp = requests.post(f"{API_URL}/registros", json=payload, timeout=25)
+            resp = http().post(f"{API_URL}/registros", json=payload, timeout=25)
+            anotar_escritura(resp)
 
             if resp.status_code == 200:
                 data = resp.json()
@@ -584,4 +699,53 @@ with tab_salida:
 
         estado = st.session_state.registro_estado.get(str(sel), "borrador")
         st.caption(f"Estado guardado (UI): {estado}  ·  (El backend es la fuente real al cerrar)")
-        st.caption("La bandeja es una lista de trabajo de la sesión actual. Luego la exportamos a Excel/CSV si lo deseas.")
+
+        abiertos = [i for i in ids if st.session_state.registro_estado.get(str(i), "borrador") != "cerrado"]
+        m1, m2 = st.columns([6, 2])
+        with m1:
+            sel_lote = st.multiselect("Cerrar varios (fin de turno)", ids, default=abiertos, key="sel_cierre_lote")
+        with m2:
+            st.write("")
+            if st.button("🔒 Cerrar seleccionados", use_container_width=True, disabled=not sel_lote):
+                cerrar_lote_backend([int(i) for i in sel_lote])
+        st.caption("La bandeja es una lista de trabajo de la sesión actual.")
+
+    st.markdown("### ⬇️ Exportar SAP (CSV/XLSX)")
+    st.caption("El backend arma todas las filas en un solo request (no registro por registro).")
+    e1, e2, e3 = st.columns([2, 2, 1])
+    with e1:
+        opciones_export = ["Rango de fechas"] + (["Bandeja actual"] if st.session_state.sap_rows else [])
+        modo_export = st.radio("Qué exportar", opciones_export, horizontal=True, key="export_modo")
+    with e2:
+        formato_export = st.selectbox("Formato", ["xlsx", "csv"], key="export_formato")
+    with e3:
+        estado_export = st.selectbox("Estado", ["(todos)", "borrador", "cerrado"], key="export_estado")
+
+    params_export: dict = {"formato": formato_export}
+    if estado_export != "(todos)":
+        params_export["estado"] = estado_export
+    if modo_export == "Bandeja actual":
+        params_export["ids"] = [
+            int(row["REGISTRO_ID"]) for row in st.session_state.sap_rows if row.get("REGISTRO_ID")
+        ]
+    else:
+        rango = st.date_input("Fechas (desde / hasta)", value=(pd.Timestamp.today().date(),) * 2, key="export_rango")
+        if isinstance(rango, (list, tuple)) and len(rango) == 2:
+            params_export["desde"], params_export["hasta"] = rango[0].isoformat(), rango[1].isoformat()
+
+    if st.button("📦 Preparar exportación", use_container_width=False):
+        try:
+            r = http().get(
+                f"{API_URL}/registros/sap/exportar", params=params_export, headers=headers_lectura(), timeout=120
+            )
+            if r.status_code != 200:
+                st.error(f"No se pudo exportar: {r.status_code} - {r.text}")
+            else:
+                st.session_state["export_archivo"] = (r.content, formato_export)
+        except Exception as e:
+            st.error(f"Error exportando: {e}")
+
+    if st.session_state.get("export_archivo"):
+        contenido, fmt = st.session_state["export_archivo"]
+        mime = "text/csv" if fmt == "csv" else "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        st.download_button("⬇️ Descargar", contenido, file_name=f"sap_export.{fmt}", mime=mime)